@@ -52,6 +52,14 @@ class AirportComparison:
             logger.warning(f"Ошибка извлечения аэропорта из URL: {e}")
             return "Неизвестно"
     
+    def extract_airports_from_urls(self, urls: pd.Series) -> pd.Series:
+        """Векторная версия extract_airport_from_url для целой колонки URL"""
+        has_url = urls.notna()
+        airports = urls.astype(object).str.extract(r'filter\[from\]=([^&]*)', expand=False)
+        result = airports.str.split(',').str[0].where(airports.fillna('') != '', "Все аэропорты")
+        # Как и в построчной версии: пустой URL -> "Неизвестно"
+        return result.where(has_url, "Неизвестно")
+    
     def compare_airports(self, warsaw_data_file: str, any_airports_data_file: str) -> Dict[str, Any]:
         """Сравнивает данные из Варшавы и всех аэропортов"""
         logger.info("🔄 Начинаем сравнение аэропортов...")
@@ -69,14 +77,15 @@ class AirportComparison:
         
         # Добавляем информацию об аэропорте
         warsaw_df['departure_airport'] = 'Warszawa'
-        any_airports_df['departure_airport'] = any_airports_df['url'].apply(self.extract_airport_from_url)
+        any_airports_df['departure_airport'] = self.extract_airports_from_urls(any_airports_df['url'])
         
         # Находим отели до 8000 PLN, которые есть в любых аэропортах, но нет в Варшаве
-        warsaw_hotels = set(warsaw_df['hotel_name'].unique())
-        any_airports_hotels = set(any_airports_df['hotel_name'].unique())
+        # pd.Index: разности/пересечения считаются в хеш-таблицах pandas, а не в Python-множествах
+        warsaw_hotels = pd.Index(warsaw_df['hotel_name'].unique())
+        any_airports_hotels = pd.Index(any_airports_df['hotel_name'].unique())
         
         # Отели, которые есть в любых аэропортах, но нет в Варшаве
-        missing_in_warsaw = any_airports_hotels - warsaw_hotels
+        missing_in_warsaw = any_airports_hotels.difference(warsaw_hotels)
         
         # Фильтруем по цене до 8000 PLN
         missing_under_8000 = any_airports_df[
@@ -91,36 +100,37 @@ class AirportComparison:
         missing_under_8000 = missing_under_8000.sort_values('price')
         
         # Находим отели, которые есть в обеих выборках, и сравниваем цены
-        common_hotels = warsaw_hotels & any_airports_hotels
-        
-        comparison_results = []
-        
-        for hotel in common_hotels:
-            warsaw_hotel = warsaw_df[warsaw_df['hotel_name'] == hotel]
-            any_airports_hotel = any_airports_df[any_airports_df['hotel_name'] == hotel]
-            
-            if warsaw_hotel.empty or any_airports_hotel.empty:
-                continue
-            
-            # Берем минимальные цены
-            warsaw_min_price = warsaw_hotel['price'].min()
-            any_airports_min_price = any_airports_hotel['price'].min()
-            
-            # Находим лучшее предложение из любых аэропортов
-            best_any_airports = any_airports_hotel.loc[any_airports_hotel['price'].idxmin()]
-            
-            if any_airports_min_price < warsaw_min_price:
-                comparison_results.append({
-                    'hotel_name': hotel,
-                    'warsaw_price': warsaw_min_price,
-                    'best_other_price': any_airports_min_price,
-                    'savings': warsaw_min_price - any_airports_min_price,
-                    'savings_percent': ((warsaw_min_price - any_airports_min_price) / warsaw_min_price) * 100,
-                    'best_departure_airport': best_any_airports['departure_airport'],
-                    'best_offer_url': best_any_airports.get('offer_url', ''),
-                    'best_dates': best_any_airports.get('dates', ''),
-                    'best_duration': best_any_airports.get('duration', '')
-                })
+        common_hotels = any_airports_hotels.intersection(warsaw_hotels)
+        
+        # Минимальная цена из Варшавы и лучшее предложение из любых аэропортов по каждому общему отелю —
+        # одной группировкой и join вместо фильтрации обеих таблиц по каждому отелю
+        warsaw_min_prices = warsaw_df.groupby('hotel_name')['price'].min().rename('warsaw_price')
+        any_common = any_airports_df[any_airports_df['hotel_name'].isin(common_hotels)]
+        best_any_airports = any_airports_df.loc[any_common.groupby('hotel_name')['price'].idxmin()]
+        best_any_airports = best_any_airports.set_index('hotel_name').join(warsaw_min_prices, how='inner')
+        
+        cheaper = best_any_airports[best_any_airports['price'] < best_any_airports['warsaw_price']]
+        cheaper = cheaper.reindex(
+            columns=['warsaw_price', 'price', 'departure_airport', 'offer_url', 'dates', 'duration'],
+            fill_value=''
+        )
+        savings = cheaper['warsaw_price'] - cheaper['price']
+        cheaper = cheaper.assign(savings=savings, savings_percent=(savings / cheaper['warsaw_price']) * 100)
+        
+        comparison_results = [
+            {
+                'hotel_name': hotel,
+                'warsaw_price': row['warsaw_price'],
+                'best_other_price': row['price'],
+                'savings': row['savings'],
+                'savings_percent': row['savings_percent'],
+                'best_departure_airport': row['departure_airport'],
+                'best_offer_url': row['offer_url'],
+                'best_dates': row['dates'],
+                'best_duration': row['duration']
+            }
+            for hotel, row in zip(cheaper.index, cheaper.to_dict('records'))
+        ]
         
         # Сортируем по экономии
         comparison_results.sort(key=lambda x: x['savings'], reverse=True)
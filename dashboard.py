@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Общие части генераторов дашбордов: загрузка данных, статистика, изменения цен,
+история алертов, HTML-блоки и запись страницы.
+
+Используется generate_inline_charts_dashboard.py и
+generate_inline_charts_dashboard_with_airport_comparison_final.py.
+Единая точка входа: python -m dashboard --variant standard|airport-comparison ...
+"""
+
+import pandas as pd
+import json
+import csv
+import gzip
+import hashlib
+import io
+from datetime import datetime, timedelta, timezone
+import os
+import re
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Union
+
+
+_STYLE_BLOCK_RE = re.compile(r'(<style>)(.*?)(</style>)', re.S)
+
+# Колонки CSV, которые нужны дашборду (rating не используется)
+DASHBOARD_COLUMNS = ('hotel_name', 'price', 'dates', 'duration', 'departure_airport', 'from_airport',
+                     'scraped_at', 'url', 'image_url', 'offer_url')
+# Строковые колонки с малым числом уникальных значений храним как category.
+# hotel_name остается строкой: по нему группируем, а category-группировка тянет пустые категории
+DASHBOARD_DTYPES = {
+    'price': 'float64',
+    'dates': 'category',
+    'duration': 'category',
+    'departure_airport': 'category',
+    'url': 'category',
+}
+
+
+def minify_css(css: str) -> str:
+    """Убирает из CSS комментарии, отступы и пробелы вокруг разделителей"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    return re.sub(r'\s*([{};,])\s*', r'\1', css).strip()
+
+
+# Буфер записи HTML: части страницы копятся в нем, а не в одной растущей строке
+HTML_WRITE_BUFFER = 1024 * 1024
+
+
+def write_html(output_file: str, html_parts: Iterable[Union[str, Iterable[str]]]):
+    """Записывает HTML по частям (CSS минифицируется) и gzip-копию рядом (для отдачи сжатых байтов).
+
+    Часть — строка или итератор строк (строки таблиц, алерты): итераторы расходуются по одной
+    строке во время записи, так что повторяющиеся блоки страницы в памяти не собираются.
+    Блок <style> должен целиком лежать в одной строковой части.
+    """
+    if isinstance(html_parts, str):
+        html_parts = [html_parts]
+    # mtime=0 — чтобы .gz не менялся между ранами без изменений в HTML
+    with open(output_file, 'w', encoding='utf-8', newline='', buffering=HTML_WRITE_BUFFER) as f, \
+            gzip.GzipFile(output_file + '.gz', 'wb', compresslevel=6, mtime=0) as gz, \
+            io.TextIOWrapper(io.BufferedWriter(gz, HTML_WRITE_BUFFER), encoding='utf-8', newline='') as g:
+        for part in html_parts:
+            if isinstance(part, str):
+                part = _STYLE_BLOCK_RE.sub(lambda m: m.group(1) + minify_css(m.group(2)) + m.group(3), part)
+                f.write(part)
+                g.write(part)
+            else:
+                for chunk in part:
+                    f.write(chunk)
+                    g.write(chunk)
+
+
+def input_cache_key(files: List[Optional[str]], **params) -> str:
+    """Ключ кэша дашборда: mtime и размер входных файлов (и самого dashboard.py) плюс параметры генерации"""
+    h = hashlib.blake2b(digest_size=16)
+    for path in list(files) + [__file__]:
+        if path and os.path.exists(path):
+            st = os.stat(path)
+            h.update(f"{path}:{st.st_mtime_ns}:{st.st_size}\n".encode('utf-8'))
+        else:
+            h.update(f"{path}:-\n".encode('utf-8'))
+    for name in sorted(params):
+        h.update(f"{name}={params[name]}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def _cache_key_file(output_file: str) -> str:
+    folder, name = os.path.split(output_file)
+    return os.path.join(folder, f".{name}.cachekey")
+
+
+def is_output_fresh(output_file: str, cache_key: str) -> bool:
+    """True, если output_file уже сгенерирован из тех же входных данных"""
+    if not os.path.exists(output_file):
+        return False
+    try:
+        with open(_cache_key_file(output_file), 'r', encoding='utf-8') as f:
+            return f.read().strip() == cache_key
+    except OSError:
+        return False
+
+
+def save_cache_key(output_file: str, cache_key: str):
+    """Сохраняет ключ кэша рядом с output_file (.<имя>.cachekey)"""
+    with open(_cache_key_file(output_file), 'w', encoding='utf-8') as f:
+        f.write(cache_key)
+
+
+def load_data(data_file: str, tz: str = 'Europe/Warsaw') -> Optional[pd.DataFrame]:
+    """Загружает CSV и добавляет колонки scraped_at_local/scraped_at_display в таймзоне tz"""
+    try:
+        df = pd.read_csv(
+            data_file,
+            quoting=csv.QUOTE_ALL,
+            on_bad_lines='skip',
+            usecols=lambda c: c in DASHBOARD_COLUMNS,
+            dtype=DASHBOARD_DTYPES,
+        )
+        # Нормализуем время: аккуратно обрабатываем смешанные строки (с/без таймзоны)
+        raw = df['scraped_at'].astype(str)
+        mask_tz = raw.str.contains(r"Z$|[+-]\d{2}:\d{2}$", regex=True)
+        # format='ISO8601' — быстрый разбор в C без угадывания формата по первой строке
+        tz_series = pd.to_datetime(raw.where(mask_tz), errors='coerce', utc=True, format='ISO8601')
+        tz_series = tz_series.dt.tz_convert(tz)
+        naive_series = pd.to_datetime(raw.where(~mask_tz), errors='coerce', format='ISO8601')
+        try:
+            naive_series = naive_series.dt.tz_localize(tz)
+        except Exception:
+            # Если часть уже осознанно tz-aware/NaT — оставим как есть
+            pass
+        df['scraped_at_local'] = tz_series.combine_first(naive_series)
+        # Убираем строки с некорректной датой
+        df = df.dropna(subset=['scraped_at_local'])
+        # Используем локализованное время без дополнительных сдвигов
+        df['scraped_at_display'] = df['scraped_at_local']
+        print(f"✅ Загружено {len(df)} записей")
+        return df
+    except Exception as e:
+        print(f"❌ Ошибка загрузки данных: {e}")
+        return None
+
+
+def compute_stats(df: pd.DataFrame) -> Dict[str, Any]:
+    """Считает сводную статистику для блока метрик"""
+    return {
+        'total_offers': len(df),
+        'unique_hotels': df['hotel_name'].nunique(),
+        'avg_price': df['price'].mean(),
+        'min_price': df['price'].min(),
+        'max_price': df['price'].max(),
+    }
+
+
+def latest_prices(df_part: pd.DataFrame) -> Dict[str, float]:
+    """Последняя цена каждого отеля в срезе (одна группировка вместо цикла по группам)"""
+    return df_part.groupby('hotel_name')['price'].last().to_dict()
+
+
+def latest_hotel_rows(df_sorted_all: pd.DataFrame) -> pd.DataFrame:
+    """Последнее наблюдение по каждому отелю (df отсортирован по отелю и времени), одной выборкой строк"""
+    columns = ['hotel_name', 'price', 'dates', 'duration', 'scraped_at_local', 'url',
+               'from_airport', 'offer_url', 'image_url']
+    last = df_sorted_all.groupby('hotel_name').tail(1)
+    return last.reindex(columns=columns).astype({'price': 'float64'}).reset_index(drop=True)
+
+
+def split_runs(df_sorted: pd.DataFrame, gap_minutes: int = 5) -> List[tuple]:
+    """Делит отсортированные по времени данные на раны (интервалы > gap_minutes).
+
+    Возвращает [(время начала рана, {отель: последняя цена в ране}), ...] — считается один раз
+    и переиспользуется и для ТОП-10, и для индекса ценовой динамики.
+    """
+    # Номер рана для каждой строки: счетчик разрывов больше gap_minutes
+    run_id = (df_sorted['scraped_at_display'].diff() > pd.Timedelta(minutes=gap_minutes)).cumsum()
+    run_times = df_sorted['scraped_at_display'].groupby(run_id).first()
+    # Отель кодируем целым числом (коды в порядке имен) и упаковываем (ран, отель) в один int64-ключ:
+    # группировка по числу вместо пары (ран, строка с названием)
+    codes, hotel_names = pd.factorize(df_sorted['hotel_name'], sort=True)
+    valid = codes >= 0
+    n_hotels = max(len(hotel_names), 1)
+    keys = run_id.to_numpy()[valid] * n_hotels + codes[valid]
+    last_prices = pd.Series(df_sorted['price'].to_numpy()[valid]).groupby(keys).last()
+    run_prices = {}
+    for key, price in zip(last_prices.index.tolist(), last_prices.tolist()):
+        run_prices.setdefault(key // n_hotels, {})[hotel_names[key % n_hotels]] = price
+    return [(run_time, run_prices.get(rid, {})) for rid, run_time in run_times.items()]
+
+
+def compute_deltas(df_sorted: pd.DataFrame, window_hours: int):
+    """Изменения цен по отелям за окно window_hours.
+
+    df_sorted должен быть отсортирован по отелю и времени; базовые цены для всех отелей
+    выбираются групповыми операциями, без цикла с фильтрацией каждого отеля.
+    Возвращает (топ-5 снижений, топ-5 повышений, {отель: (изменение, изменение %) или None}).
+    """
+    times = df_sorted['scraped_at_display']
+    hotels = df_sorted['hotel_name']
+    cutoff = (times.max() or datetime.now()) - timedelta(hours=window_hours)
+    pos_from_end = df_sorted.groupby('hotel_name').cumcount(ascending=False)
+    in_win = times >= cutoff
+    win_rank = in_win.groupby(hotels).cumsum()
+
+    # Последняя запись отеля; базовая цена — первая в окне (если в окне >= 2 записей), иначе предпоследняя
+    latest = df_sorted.loc[pos_from_end == 0, ['hotel_name', 'price', 'scraped_at_display']].set_index('hotel_name')
+    baseline = df_sorted.loc[pos_from_end == 1].set_index('hotel_name')['price'].reindex(latest.index)
+    win_first = df_sorted.loc[in_win & (win_rank == 1)].set_index('hotel_name')['price'].reindex(latest.index)
+    use_win = (in_win.groupby(hotels).sum().reindex(latest.index) >= 2).to_numpy()
+    baseline[use_win] = win_first[use_win]
+
+    changes = []
+    deltas_map = {}
+    for hotel_name, latest_price, baseline_price, latest_time in zip(
+            latest.index, latest['price'].tolist(), baseline.tolist(), latest['scraped_at_display']):
+        deltas_map[hotel_name] = None
+        if pd.isna(baseline_price) or baseline_price == 0:
+            continue
+        change = latest_price - baseline_price
+        if change == 0:
+            continue
+        change_percent = (change / baseline_price) * 100.0
+        changes.append({
+            'hotel_name': hotel_name,
+            'old_price': baseline_price,
+            'new_price': latest_price,
+            'change': change,
+            'change_percent': change_percent,
+            'timestamp': str(latest_time)
+        })
+        deltas_map[hotel_name] = (change, change_percent)
+    decreases = sorted([h for h in changes if h['change'] < 0], key=lambda x: x['change'])[:5]
+    increases = sorted([h for h in changes if h['change'] > 0], key=lambda x: x['change'], reverse=True)[:5]
+    return decreases, increases, deltas_map
+
+
+def compute_since_start_deltas(df_sorted: pd.DataFrame) -> Dict[str, Any]:
+    """Изменение с начала наблюдений (первое значение -> последнее) по каждому отелю.
+
+    df_sorted должен быть отсортирован по отелю и времени; считается сразу для всех отелей.
+    """
+    prices = df_sorted.groupby('hotel_name')['price']
+    first_price = prices.first()
+    change_abs = prices.last() - first_price
+    change_pct = (change_abs / first_price) * 100.0
+    since_start_delta = {}
+    for hotel_name, first, change, pct in zip(first_price.index, first_price.tolist(),
+                                              change_abs.tolist(), change_pct.tolist()):
+        since_start_delta[hotel_name] = None if first == 0 else (change, pct)
+    return since_start_delta
+
+
+def default_alerts_file(data_file: str) -> str:
+    """Файл алертов по умолчанию для файла данных"""
+    if 'egypt' in data_file:
+        return 'data/egypt_travel_prices_alerts.jsonl'
+    elif 'turkey' in data_file:
+        return 'data/turkey_travel_prices_alerts.jsonl'
+    return 'data/travel_prices_alerts.jsonl'
+
+
+def resolve_alerts_file(alerts_file: Optional[str], data_file: str) -> str:
+    """Файл алертов, который будет прочитан load_alerts"""
+    # Автоматически определяем файл алертов на основе файла данных
+    if alerts_file is None:
+        alerts_file = default_alerts_file(data_file)
+
+    # История в JSON Lines (price_alerts_v2): пока ее нет, читаем прежний JSON с тем же именем
+    if alerts_file.endswith('.jsonl') and not os.path.exists(alerts_file):
+        alerts_file = os.path.splitext(alerts_file)[0] + '.json'
+    return alerts_file
+
+
+def load_alerts(alerts_file: Optional[str], data_file: str) -> List[Dict[str, Any]]:
+    """Загружает историю алертов (новые сверху); файл по умолчанию определяется по data_file"""
+    alerts = []
+    alerts_file = resolve_alerts_file(alerts_file, data_file)
+
+    if alerts_file.endswith('.jsonl') and os.path.exists(alerts_file):
+        with open(alerts_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    if line.strip():
+                        alerts.append(json.loads(line))
+                except ValueError:
+                    # Недописанную строку пропускаем, остальная история остается
+                    continue
+    elif os.path.exists(alerts_file):
+        try:
+            with open(alerts_file, 'r', encoding='utf-8') as f:
+                alerts_data = json.load(f)
+                # Поддерживаем как старый формат {"alerts": [...]}, так и новый формат [...]
+                if isinstance(alerts_data, dict) and 'alerts' in alerts_data:
+                    alerts = alerts_data.get('alerts', [])
+                elif isinstance(alerts_data, list):
+                    alerts = alerts_data
+                else:
+                    alerts = []
+        except Exception:
+            alerts = []
+
+    def parse_iso(ts):
+        try:
+            dt = datetime.fromisoformat(ts)
+            # Если datetime naive, делаем его UTC
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return dt
+        except Exception:
+            return datetime.min.replace(tzinfo=timezone.utc)
+
+    # Сортируем по времени создания (created_at) если есть, иначе по timestamp
+    alerts.sort(key=lambda a: parse_iso(a.get('created_at') or a.get('timestamp') or a.get('time') or ''), reverse=True)
+    return alerts
+
+
+def slugify(text: str) -> str:
+    """Слуг-имя файла по названию отеля"""
+    text = text.lower().strip()
+    text = re.sub(r"[^a-z0-9]+", "-", text)
+    text = re.sub(r"-+", "-", text).strip('-')
+    return text or "hotel"
+
+
+def render_changes(decreases: List[Dict[str, Any]], increases: List[Dict[str, Any]], period: str) -> str:
+    """HTML блок наиболее подешевевших/подорожавших отелей за период; пусто, если списки пустые"""
+    if not decreases and not increases:
+        return ""
+    changes_html = """
+        <div class=\"changes-section\">"""
+    for items, css_class, heading in (
+        (decreases, 'change-decrease', f"📉 Наиболее подешевевшие ({period})"),
+        (increases, 'change-increase', f"📈 Наиболее подорожавшие ({period})"),
+    ):
+        if not items:
+            continue
+        changes_html += f"""
+            <div class=\"changes-block\">
+                <h3>{heading}</h3>"""
+        for change in items:
+            changes_html += f"""
+                <div class=\"change-item {css_class}\">
+                    <div>
+                        <div class=\"hotel-name\">{change['hotel_name']}</div>
+                        <div class=\"change-percent\">{change['change']:+.0f} PLN ({change['change_percent']:+.1f}%)</div>
+                    </div>
+                    <div class=\"change-price\">{change['old_price']:.0f} → {change['new_price']:.0f} PLN</div>
+                </div>"""
+        changes_html += """
+            </div>"""
+    changes_html += """
+        </div>"""
+    return changes_html
+
+
+def iter_alerts_html(alerts: List[Dict[str, Any]]) -> Iterator[str]:
+    """HTML истории алертов по одному алерту (для потоковой записи через write_html);
+    поддерживает старые и новые форматы записей и алерты о пропавших отелях"""
+    if not alerts:
+        yield """
+                <div class="alerts-empty">Нет алертов</div>
+"""
+        return
+    for a in alerts:
+        hotel_name = a.get('hotel_name') or a.get('hotel') or 'Unknown'
+        alert_type = a.get('alert_type') or a.get('type') or ''
+        old_price = a.get('old_price') or a.get('from') or a.get('previous_price')
+        new_price = a.get('new_price') if 'new_price' in a else (a.get('to') or a.get('current_price'))
+        ts = a.get('timestamp') or a.get('time') or ''
+
+        if alert_type == 'missing' or new_price in (None, '', 'null'):
+            direction_class = 'alert-missing'
+            change_text = f"— {a.get('message') or a.get('note') or 'Отель пропал из выдачи'}"
+            price_text = f"{old_price if old_price is not None else '—'} → —"
+        else:
+            # Обычный ценовой алерт (новая структура)
+            change_pct = a.get('price_change_pct', 0.0)
+            price_change = a.get('price_change', 0.0)
+            direction_class = 'alert-increase' if price_change > 0 else ('alert-decrease' if price_change < 0 else '')
+            arrow = '↑' if price_change > 0 else ('↓' if price_change < 0 else '→')
+            change_text = f"{arrow} {change_pct:+.1f}%"
+            price_text = f"{old_price} → {new_price} PLN"
+        yield f"""
+                <div class="alert-item {direction_class}">
+                    <div>
+                        <div class="hotel-name">{hotel_name}</div>
+                        <div class="change-percent">{change_text} • {ts}</div>
+                    </div>
+                    <div class="change-price">{price_text}</div>
+                </div>
+"""
+
+
+def build_dashboard(variant: str = 'standard', **kwargs):
+    """Генерирует дашборд выбранного варианта: 'standard' или 'airport-comparison'"""
+    if variant == 'airport-comparison':
+        from generate_inline_charts_dashboard_with_airport_comparison_final import generate_inline_charts_dashboard
+    else:
+        kwargs.pop('airport_comparison_file', None)
+        from generate_inline_charts_dashboard import generate_inline_charts_dashboard
+    return generate_inline_charts_dashboard(**kwargs)
+
+
+# Дашборды стран для CI: (файл данных, HTML, заголовок, папка графиков).
+# Вариант со сравнением аэропортов выбирается, если рядом с данными есть *_airport_comparison.json
+COUNTRY_DASHBOARDS = [
+    ('data/travel_prices.csv', 'index_greece.html', 'Мониторинг цен • Греция', 'hotel-charts/greece'),
+    ('data/egypt_travel_prices.csv', 'index_egypt.html', 'Мониторинг цен • Египет', 'hotel-charts/egypt'),
+    ('data/turkey_travel_prices.csv', 'index_turkey.html', 'Мониторинг цен • Турция', 'hotel-charts/turkey'),
+]
+
+
+def _build_country_dashboard(entry, force: bool = False) -> Optional[str]:
+    """Генерирует дашборд одной страны из COUNTRY_DASHBOARDS; возвращает текст ошибки или None"""
+    data_file, output_file, title, charts_subdir = entry
+    comparison_file = data_file.replace('.csv', '_airport_comparison.json')
+    variant = 'airport-comparison' if os.path.exists(comparison_file) else 'standard'
+    try:
+        build_dashboard(variant, data_file=data_file, output_file=output_file, title=title,
+                        charts_subdir=charts_subdir, alerts_file=default_alerts_file(data_file),
+                        airport_comparison_file=comparison_file, force=force)
+    except Exception as e:
+        return str(e)
+    print(f"✅ {title}: {output_file} ({variant})")
+    return None
+
+
+def build_country_dashboards(force: bool = False, workers: Optional[int] = None) -> bool:
+    """Генерирует дашборды всех стран параллельно, по процессу на страну.
+
+    Генерация упирается в CPU (pandas и сборка HTML), а страны пишут каждая в свои файлы.
+    Ошибка одной страны не останавливает остальные; возвращает True, если все дашборды собраны.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    
+    with ProcessPoolExecutor(max_workers=workers or len(COUNTRY_DASHBOARDS)) as executor:
+        errors = list(executor.map(_build_country_dashboard, COUNTRY_DASHBOARDS,
+                                   [force] * len(COUNTRY_DASHBOARDS)))
+    
+    ok = True
+    for (_, output_file, title, _), error in zip(COUNTRY_DASHBOARDS, errors):
+        if error is not None:
+            print(f"❌ {title}: ошибка генерации {output_file}: {error}")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Generate dashboard')
+    parser.add_argument('--variant', choices=['standard', 'airport-comparison'], default='standard')
+    parser.add_argument('--data-file', default='data/travel_prices.csv')
+    parser.add_argument('--output', default='index.html')
+    parser.add_argument('--title', default='Travel Price Monitor • Расширенный дашборд')
+    parser.add_argument('--charts-dir', default='hotel-charts')
+    parser.add_argument('--tz', default='Europe/Warsaw')
+    parser.add_argument('--alerts-file', default=None)
+    parser.add_argument('--all-airports-data-file', default=None, help='CSV с общим фильтром (любой аэропорт) для сравнения')
+    parser.add_argument('--airport-comparison-file', default=None, help='JSON файл с результатами сравнения аэропортов')
+    parser.add_argument('--force', action='store_true', help='Генерировать даже если входные данные не изменились')
+    parser.add_argument('--all-countries', action='store_true', help='Сгенерировать дашборды всех стран (COUNTRY_DASHBOARDS)')
+    args = parser.parse_args()
+    if args.all_countries:
+        raise SystemExit(0 if build_country_dashboards(force=args.force) else 1)
+    build_dashboard(args.variant, data_file=args.data_file, output_file=args.output, title=args.title, charts_subdir=args.charts_dir, tz=args.tz, alerts_file=args.alerts_file, all_airports_data_file=args.all_airports_data_file, airport_comparison_file=args.airport_comparison_file, force=args.force)
@@ -5,47 +5,53 @@
 
 import pandas as pd
 import json
-import csv
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 import os
-import re
 from urllib.parse import urlparse, parse_qs
 
-def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv', output_file: str = 'index.html', title: str = 'Travel Price Monitor • Расширенный дашборд', charts_subdir: str = 'hotel-charts', tz: str = 'Europe/Warsaw', alerts_file: str = None, all_airports_data_file: str = None):
+from dashboard import (
+    write_html, load_data, compute_stats, compute_deltas, compute_since_start_deltas,
+    load_alerts, slugify, render_changes, iter_alerts_html,
+    split_runs, latest_hotel_rows,
+    resolve_alerts_file, input_cache_key, is_output_fresh, save_cache_key,
+)
+
+# Шаблон строки таблицы отелей (подставляется через format_map)
+TABLE_ROW_TPL = """
+                    <tr>
+                        <td class="hotel-name"><a class="open-chart-link" href="{chart_href}" target="_blank" onmouseover="_hoverPreview.show(event,'{hotel_name}')" onmouseout="_hoverPreview.hide()">{hotel_name}</a></td>
+                        <td class="price" data-sort-value="{price}">{price:.0f} PLN</td>
+                        <td class="{delta_class}" data-sort-value="{delta_sort}">{delta_display}</td>
+                        <td data-sort-value="{since_sort}">{since_display}</td>
+                        <td data-sort-value="{dates}">{dates}</td>
+                        <td data-sort-value="{duration}">{duration}</td>
+                        
+                        <td class="offer-link-cell">{offer_link_html}</td>
+                    </tr>"""
+
+def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv', output_file: str = 'index.html', title: str = 'Travel Price Monitor • Расширенный дашборд', charts_subdir: str = 'hotel-charts', tz: str = 'Europe/Warsaw', alerts_file: str = None, all_airports_data_file: str = None, force: bool = False):
     """Генерирует дашборд с встроенными графиками"""
     
+    # Если входные данные не менялись с прошлой генерации — страница уже актуальна
+    cache_key = input_cache_key([data_file, resolve_alerts_file(alerts_file, data_file), all_airports_data_file, __file__], title=title, charts_subdir=charts_subdir, tz=tz)
+    if not force and is_output_fresh(output_file, cache_key):
+        print(f"⏭️ Входные данные не изменились, {output_file} актуален — пропускаем генерацию")
+        return
+    
     # Загружаем данные
-    try:
-        df = pd.read_csv(data_file, quoting=csv.QUOTE_ALL, on_bad_lines='skip')
-        # Нормализуем время: аккуратно обрабатываем смешанные строки (с/без таймзоны)
-        raw = df['scraped_at'].astype(str)
-        mask_tz = raw.str.contains(r"Z$|[+-]\d{2}:\d{2}$", regex=True)
-        tz_series = pd.to_datetime(raw.where(mask_tz), errors='coerce', utc=True)
-        tz_series = tz_series.dt.tz_convert(tz)
-        naive_series = pd.to_datetime(raw.where(~mask_tz), errors='coerce')
-        try:
-            naive_series = naive_series.dt.tz_localize(tz)
-        except Exception:
-            # Если часть уже осознанно tz-aware/NaT — оставим как есть
-            pass
-        df['scraped_at_local'] = tz_series.combine_first(naive_series)
-        # Убираем строки с некорректной датой
-        df = df.dropna(subset=['scraped_at_local'])
-        # Используем локализованное время без дополнительных сдвигов
-        df['scraped_at_display'] = df['scraped_at_local']
-        print(f"✅ Загружено {len(df)} записей")
-    except Exception as e:
-        print(f"❌ Ошибка загрузки данных: {e}")
+    df = load_data(data_file, tz)
+    if df is None:
         return
     # Откат фичи сравнения аэропортов: не используем общий датасет
     df_all_airports = None
     
     # Вычисляем статистику
-    total_offers = len(df)
-    unique_hotels = df['hotel_name'].nunique()
-    avg_price = df['price'].mean()
-    min_price = df['price'].min()
-    max_price = df['price'].max()
+    stats = compute_stats(df)
+    total_offers = stats['total_offers']
+    unique_hotels = stats['unique_hotels']
+    avg_price = stats['avg_price']
+    min_price = stats['min_price']
+    max_price = stats['max_price']
 
     # Функция для генерации hover-данных с использованием встроенных возможностей Plotly
     def generate_hover_data(detailed_data):
@@ -242,38 +248,18 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
         run_data = []
         top10_detailed_data = []  # Детальная информация для hover
         
-        # Находим границы ранов (интервалы > 5 минут)
-        df_sorted['time_diff'] = df_sorted['scraped_at_display'].diff()
-        run_boundaries = df_sorted[df_sorted['time_diff'] > pd.Timedelta(minutes=5)].index.tolist()
-        
-        # Добавляем начало и конец данных
-        run_starts = [0] + run_boundaries
-        run_ends = run_boundaries + [len(df_sorted)]
+        # Раны (интервалы > 5 минут) и последние цены отелей в каждом — считаем один раз
+        runs = split_runs(df_sorted)
         
-        print(f"🔍 Найдено {len(run_starts)} ранов")
+        print(f"🔍 Найдено {len(runs)} ранов")
         
         # Обрабатываем каждый ран
-        for i, (start_idx, end_idx) in enumerate(zip(run_starts, run_ends)):
-            run_data_slice = df_sorted.iloc[start_idx:end_idx]
-            if len(run_data_slice) == 0:
-                continue
-                
-            run_time = run_data_slice['scraped_at_display'].iloc[0]  # Время начала рана
+        for run_time, hotel_prices in runs:  # Время начала рана, словарь отель -> цена
+            run_prices = list(hotel_prices.values())
             
-            # Для каждого рана берем последние данные по каждому отелю в этом ране
-            latest_prices = []
-            hotel_prices = {}  # Словарь отель -> цена для этого рана
-            
-            # Берем последние данные по каждому отелю в этом ране
-            for hotel_name, hotel_grp in run_data_slice.groupby('hotel_name'):
-                if not hotel_grp.empty:
-                    latest_price = hotel_grp.iloc[-1]['price']
-                    latest_prices.append(latest_price)
-                    hotel_prices[hotel_name] = latest_price
-            
-            if len(latest_prices) >= 10:
+            if len(run_prices) >= 10:
                 # Берем ТОП-10 дешевых из всех отелей на этот ран
-                sorted_prices = sorted(latest_prices)
+                sorted_prices = sorted(run_prices)
                 top10_prices = sorted_prices[:10]
                 avg_price = sum(top10_prices) / len(top10_prices)
                 
@@ -297,12 +283,12 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
                     'avg_price': avg_price,
                     'top10_hotels': top10_hotels
                 })
-            elif len(latest_prices) > 0:
+            elif len(run_prices) > 0:
                 # Если отелей меньше 10, берем все
-                avg_price = sum(latest_prices) / len(latest_prices)
+                avg_price = sum(run_prices) / len(run_prices)
                 
                 # Все отели попадают в "ТОП"
-                sorted_prices = sorted(latest_prices)
+                sorted_prices = sorted(run_prices)
                 top_hotels = []
                 for hotel_name, price in hotel_prices.items():
                     top_hotels.append({
@@ -412,19 +398,7 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
         prev_hotel_prices = {}
         
         # Обрабатываем каждый ран
-        for i, (start_idx, end_idx) in enumerate(zip(run_starts, run_ends)):
-            run_data_slice = df_sorted.iloc[start_idx:end_idx]
-            if len(run_data_slice) == 0:
-                continue
-                
-            run_time = run_data_slice['scraped_at_display'].iloc[0]  # Время начала рана
-            
-            # Собираем текущие цены отелей в этом ране
-            current_hotel_prices = {}
-            for hotel_name, hotel_grp in run_data_slice.groupby('hotel_name'):
-                if not hotel_grp.empty:
-                    latest_price = hotel_grp.iloc[-1]['price']
-                    current_hotel_prices[hotel_name] = latest_price
+        for run_time, current_hotel_prices in runs:
             
             # Рассчитываем индекс ценовой динамики
             total_price_change = 0
@@ -474,21 +448,7 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
     
     # Получаем актуальные цены по каждому отелю (последнее наблюдение)
     df_sorted_all = df.sort_values(['hotel_name', 'scraped_at_display'])
-    latest_rows = []
-    for hotel_name, grp in df_sorted_all.groupby('hotel_name'):
-        last = grp.iloc[-1]
-        latest_rows.append({
-            'hotel_name': hotel_name,
-            'price': float(last['price']),
-            'dates': last.get('dates', None),
-            'duration': last.get('duration', None),
-            'scraped_at_local': last['scraped_at_local'],
-            'url': last.get('url', None),
-            'from_airport': last.get('from_airport', None),
-            'offer_url': last.get('offer_url', None),
-            'image_url': last.get('image_url', None)
-        })
-    all_hotels = pd.DataFrame(latest_rows).sort_values('price').reset_index(drop=True)
+    all_hotels = latest_hotel_rows(df_sorted_all).sort_values('price').reset_index(drop=True)
 
     #
     # Откат: отключаем блок "до 8000 из любого вылета, отсутствующие из Варшавы"
@@ -571,49 +531,10 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
     # Анализ изменений за разные окна времени
     df_sorted = df.sort_values(['hotel_name', 'scraped_at_display'])
 
-    def compute_changes(window_hours: int):
-        cutoff = (df['scraped_at_display'].max() or datetime.now()) - timedelta(hours=window_hours)
-        changes = []
-        deltas_map = {}
-        for hotel_name, grp in df_sorted.groupby('hotel_name'):
-            grp = grp.sort_values('scraped_at_display')
-            latest_row = grp.iloc[-1]
-            latest_time = latest_row['scraped_at_display']
-            win = grp[grp['scraped_at_display'] >= cutoff]
-            if len(win) >= 2:
-                baseline_row = win.iloc[0]
-            elif len(grp) >= 2:
-                baseline_row = grp.iloc[-2]
-            else:
-                deltas_map[hotel_name] = None
-                continue
-            latest_price = float(latest_row['price'])
-            baseline_price = float(baseline_row['price'])
-            if baseline_price == 0:
-                deltas_map[hotel_name] = None
-                continue
-            change = latest_price - baseline_price
-            if change == 0:
-                deltas_map[hotel_name] = None
-                continue
-            change_percent = (change / baseline_price) * 100.0
-            changes.append({
-                'hotel_name': hotel_name,
-                'old_price': baseline_price,
-                'new_price': latest_price,
-                'change': change,
-                'change_percent': change_percent,
-                'timestamp': str(latest_time)
-            })
-            deltas_map[hotel_name] = (change, change_percent)
-        decreases = sorted([h for h in changes if h['change'] < 0], key=lambda x: x['change'])[:5]
-        increases = sorted([h for h in changes if h['change'] > 0], key=lambda x: x['change'], reverse=True)[:5]
-        return decreases, increases, deltas_map
-
     # Для таблицы оставляем 48ч, для блоков добавим 24ч и 7д
-    decreases_48h, increases_48h, deltas_by_hotel = compute_changes(48)
-    decreases_24h, increases_24h, _ = compute_changes(24)
-    decreases_7d, increases_7d, _ = compute_changes(24 * 7)
+    decreases_48h, increases_48h, deltas_by_hotel = compute_deltas(df_sorted, 48)
+    decreases_24h, increases_24h, _ = compute_deltas(df_sorted, 24)
+    decreases_7d, increases_7d, _ = compute_deltas(df_sorted, 24 * 7)
 
     # Метки нового минимума/максимума за 7д и 30д
     ref_time = df['scraped_at_display'].max() or datetime.now()
@@ -636,57 +557,10 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
         minmax_labels_by_hotel[hotel_name] = labels
 
     # Изменение с начала наблюдений (первое значение -> последнее)
-    since_start_delta = {}
-    for hotel_name, grp in df_sorted.groupby('hotel_name'):
-        grp = grp.sort_values('scraped_at_display')
-        first_price = float(grp.iloc[0]['price'])
-        last_price = float(grp.iloc[-1]['price'])
-        if first_price == 0:
-            since_start_delta[hotel_name] = None
-            continue
-        change_abs = last_price - first_price
-        change_pct = (change_abs / first_price) * 100.0
-        since_start_delta[hotel_name] = (change_abs, change_pct)
-    
-    # Загружаем историю алертов (если есть)
-    alerts = []
-    # Автоматически определяем файл алертов на основе файла данных
-    if alerts_file is None:
-        if 'egypt' in data_file:
-            alerts_file = 'data/egypt_travel_prices_alerts.json'
-        elif 'turkey' in data_file:
-            alerts_file = 'data/turkey_travel_prices_alerts.json'
-        else:
-            alerts_file = 'data/travel_prices_alerts.json'
-    
-    alerts_path = alerts_file
-    if os.path.exists(alerts_path):
-        try:
-            with open(alerts_path, 'r', encoding='utf-8') as f:
-                alerts_data = json.load(f)
-                # Поддерживаем как старый формат {"alerts": [...]}, так и новый формат [...]
-                if isinstance(alerts_data, dict) and 'alerts' in alerts_data:
-                    alerts = alerts_data.get('alerts', [])
-                elif isinstance(alerts_data, list):
-                    alerts = alerts_data
-                else:
-                    alerts = []
-        except Exception:
-            alerts = []
-
-    # Сортируем алерты по времени (новые сверху)
-    def parse_iso(ts):
-        try:
-            dt = datetime.fromisoformat(ts)
-            # Если datetime naive, делаем его UTC
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt
-        except Exception:
-            return datetime.min.replace(tzinfo=timezone.utc)
+    since_start_delta = compute_since_start_deltas(df_sorted)
 
-    # Сортируем по времени создания (created_at) если есть, иначе по timestamp
-    alerts.sort(key=lambda a: parse_iso(a.get('created_at') or a.get('timestamp') or a.get('time') or ''), reverse=True)
+    # Загружаем историю алертов (новые сверху)
+    alerts = load_alerts(alerts_file, data_file)
 
     # Загружаем карту изображений (если есть)
     images_map = {}
@@ -698,21 +572,15 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
         except Exception:
             images_map = {}
 
-    # Функция для слуг-имени файла по названию отеля
-    def slugify(text: str) -> str:
-        import re  # локальный импорт во избежание проблем со scope в CI
-        text = text.lower().strip()
-        text = re.sub(r"[^a-z0-9]+", "-", text)
-        text = re.sub(r"-+", "-", text).strip('-')
-        return text or "hotel"
-
     # Создаём директорию для страниц графиков
     charts_dir = os.path.join(charts_subdir)
     os.makedirs(charts_dir, exist_ok=True)
 
     # Генерируем страницу с графиком для каждого отеля
-    for hotel_name in sorted(df['hotel_name'].unique()):
-        hotel_ts = df[df['hotel_name'] == hotel_name].dropna(subset=['scraped_at_display']).sort_values('scraped_at_display')
+    # Одна сортировка и группировка вместо маски по всему df на каждый отель (ключи groupby уже отсортированы)
+    df_by_time = df.sort_values('scraped_at_display', kind='stable')
+    for hotel_name, hotel_ts in df_by_time.groupby('hotel_name', sort=True):
+        hotel_ts = hotel_ts.dropna(subset=['scraped_at_display'])
         x_values = [pd.to_datetime(t).strftime('%Y-%m-%d %H:%M') for t in hotel_ts['scraped_at_display'].tolist()]
         y_values = [float(p) for p in hotel_ts['price'].tolist()]
 
@@ -771,78 +639,7 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
 
     # HTML шаблон
     # Готовим HTML блок изменений, выводим только если есть хотя бы один список
-    changes_html = ""
-    if decreases_24h or increases_24h:
-        changes_html += """
-        <div class=\"changes-section\">"""
-        if decreases_24h:
-            changes_html += """
-            <div class=\"changes-block\">
-                <h3>📉 Наиболее подешевевшие (24ч)</h3>"""
-            for change in decreases_24h:
-                changes_html += f"""
-                <div class=\"change-item change-decrease\">
-                    <div>
-                        <div class=\"hotel-name\">{change['hotel_name']}</div>
-                        <div class=\"change-percent\">{change['change']:+.0f} PLN ({change['change_percent']:+.1f}%)</div>
-                    </div>
-                    <div class=\"change-price\">{change['old_price']:.0f} → {change['new_price']:.0f} PLN</div>
-                </div>"""
-            changes_html += """
-            </div>"""
-        if increases_24h:
-            changes_html += """
-            <div class=\"changes-block\">
-                <h3>📈 Наиболее подорожавшие (24ч)</h3>"""
-            for change in increases_24h:
-                changes_html += f"""
-                <div class=\"change-item change-increase\">
-                    <div>
-                        <div class=\"hotel-name\">{change['hotel_name']}</div>
-                        <div class=\"change-percent\">{change['change']:+.0f} PLN ({change['change_percent']:+.1f}%)</div>
-                    </div>
-                    <div class=\"change-price\">{change['old_price']:.0f} → {change['new_price']:.0f} PLN</div>
-                </div>"""
-            changes_html += """
-            </div>"""
-        changes_html += """
-        </div>"""
-
-    if decreases_7d or increases_7d:
-        changes_html += """
-        <div class=\"changes-section\">"""
-        if decreases_7d:
-            changes_html += """
-            <div class=\"changes-block\">
-                <h3>📉 Наиболее подешевевшие (7д)</h3>"""
-            for change in decreases_7d:
-                changes_html += f"""
-                <div class=\"change-item change-decrease\">
-                    <div>
-                        <div class=\"hotel-name\">{change['hotel_name']}</div>
-                        <div class=\"change-percent\">{change['change']:+.0f} PLN ({change['change_percent']:+.1f}%)</div>
-                    </div>
-                    <div class=\"change-price\">{change['old_price']:.0f} → {change['new_price']:.0f} PLN</div>
-                </div>"""
-            changes_html += """
-            </div>"""
-        if increases_7d:
-            changes_html += """
-            <div class=\"changes-block\">
-                <h3>📈 Наиболее подорожавшие (7д)</h3>"""
-            for change in increases_7d:
-                changes_html += f"""
-                <div class=\"change-item change-increase\">
-                    <div>
-                        <div class=\"hotel-name\">{change['hotel_name']}</div>
-                        <div class=\"change-percent\">{change['change']:+.0f} PLN ({change['change_percent']:+.1f}%)</div>
-                    </div>
-                    <div class=\"change-price\">{change['old_price']:.0f} → {change['new_price']:.0f} PLN</div>
-                </div>"""
-            changes_html += """
-            </div>"""
-        changes_html += """
-        </div>"""
+    changes_html = render_changes(decreases_24h, increases_24h, '24ч') + render_changes(decreases_7d, increases_7d, '7д')
 
     # Время последнего обновления для шапки
     try:
@@ -850,7 +647,7 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
     except Exception:
         updated_str = datetime.now().strftime('%d.%m.%Y %H:%M')
 
-    html_template = f"""<!DOCTYPE html>
+    html_parts = [f"""<!DOCTYPE html>
 <html lang="ru">
 <head>
     <meta charset="UTF-8">
@@ -1911,53 +1708,13 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
                 <span class="expand-icon" id="alertsExpandIcon">▼</span>
             </div>
             <div class="alerts-content" id="alertsContent">
-"""
+"""]
 
-    if alerts:
-        for a in alerts:
-            hotel_name = a.get('hotel_name') or a.get('hotel') or 'Unknown'
-            alert_type = a.get('alert_type') or a.get('type') or ''
-            old_price = a.get('old_price') or a.get('from') or a.get('previous_price')
-            new_price = a.get('new_price') if 'new_price' in a else (a.get('to') or a.get('current_price'))
-            ts = a.get('timestamp') or a.get('time') or ''
-
-            if alert_type == 'missing' or new_price in (None, '', 'null'):
-                direction_class = 'alert-missing'
-                arrow = '—'
-                change_text = a.get('message') or a.get('note') or 'Отель пропал из выдачи'
-                price_text = f"{old_price if old_price is not None else '—'} → —"
-                html_template += f"""
-                <div class="alert-item {direction_class}">
-                    <div>
-                        <div class="hotel-name">{hotel_name}</div>
-                        <div class="change-percent">{arrow} {change_text} • {ts}</div>
-                    </div>
-                    <div class="change-price">{price_text}</div>
-                </div>
-"""
-            else:
-                # Обычный ценовой алерт (новая структура)
-                change_pct = a.get('price_change_pct', 0.0)
-                price_change = a.get('price_change', 0.0)
-                direction_class = 'alert-increase' if price_change > 0 else ('alert-decrease' if price_change < 0 else '')
-                arrow = '↑' if price_change > 0 else ('↓' if price_change < 0 else '→')
-                html_template += f"""
-                <div class="alert-item {direction_class}">
-                    <div>
-                        <div class="hotel-name">{hotel_name}</div>
-                        <div class="change-percent">{arrow} {change_pct:+.1f}% • {ts}</div>
-                    </div>
-                    <div class="change-price">{old_price} → {new_price} PLN</div>
-                </div>
-"""
-    else:
-        html_template += """
-                <div class="alerts-empty">Нет алертов</div>
-"""
+    html_parts.append(iter_alerts_html(alerts))
 
     # Вставляем блок с отелями до 8000 из общего фильтра, которых нет из Варшавы
     if missing_hotels_under_8000:
-        html_template += f"""
+        html_parts.append(f"""
         </div>
     </div>
 
@@ -1975,15 +1732,16 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
                     </tr>
                 </thead>
                 <tbody>
-        """
-        for item in missing_hotels_under_8000:
-            hotel_name = item['hotel_name']
-            price = item['price']
-            dates = item.get('dates') or '—'
-            airport = item.get('airport') or '—'
-            offer_url = item.get('offer_url') or ''
-            link_html = f'<a href="{offer_url}" target="_blank" class="offer-link">🔗</a>' if offer_url else '—'
-            html_template += f"""
+        """)
+        def iter_missing_rows():
+            for item in missing_hotels_under_8000:
+                hotel_name = item['hotel_name']
+                price = item['price']
+                dates = item.get('dates') or '—'
+                airport = item.get('airport') or '—'
+                offer_url = item.get('offer_url') or ''
+                link_html = f'<a href="{offer_url}" target="_blank" class="offer-link">🔗</a>' if offer_url else '—'
+                yield f"""
                 <tr>
                     <td class="hotel-name">{hotel_name}</td>
                     <td class="price">{price:.0f} PLN</td>
@@ -1992,23 +1750,24 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
                     <td class="offer-link-cell">{link_html}</td>
                 </tr>
             """
-        html_template += """
+        html_parts.append(iter_missing_rows())
+        html_parts.append("""
                 </tbody>
             </table>
         </div>
     </div>
 
     <div class="hotels-section">
-"""
+""")
     else:
-        html_template += f"""
+        html_parts.append(f"""
             </div>
         </div>
 
         <div class="hotels-section">
-"""
+""")
 
-    html_template += f"""
+    html_parts.append(f"""
             <h3>🏨 Все отели • клик по отелю откроет график на отдельной странице</h3>
             
             <!-- Table Filters -->
@@ -2043,66 +1802,73 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
                         <th>Ссылка</th>
                     </tr>
                 </thead>
-                <tbody>"""
+                <tbody>""")
 
-    # Добавляем строки таблицы
-    for i, (_, hotel) in enumerate(all_hotels.iterrows()):
-        hotel_name = hotel['hotel_name']
-        price = hotel['price']
-        dates = hotel['dates'] if pd.notna(hotel['dates']) else '20-09-2025 - 04-10-2025'
-        duration = hotel['duration'] if pd.notna(hotel['duration']) else '6-15 дней'
-        
-        # Δ 48ч
-        delta_display = "—"
-        delta_class = "delta flat"
-        delta_info = deltas_by_hotel.get(hotel_name)
-        if delta_info is not None:
-            delta_abs, delta_pct = delta_info
-            arrow = '↑' if delta_abs > 0 else ('↓' if delta_abs < 0 else '→')
-            delta_class = 'delta up' if delta_abs > 0 else ('delta down' if delta_abs < 0 else 'delta flat')
-            sign = '+' if delta_abs > 0 else ('' if delta_abs < 0 else '')
-            delta_display = f"{arrow} {sign}{delta_pct:.1f}%"
+    # Добавляем строки таблицы: колонки берем целиком, строки отдает генератор — write_html пишет их по одной
+    dates_col = all_hotels['dates'].astype(object)
+    duration_col = all_hotels['duration'].astype(object)
+    table_columns = zip(
+        all_hotels['hotel_name'].tolist(),
+        all_hotels['price'].tolist(),
+        dates_col.where(dates_col.notna(), '20-09-2025 - 04-10-2025').tolist(),
+        duration_col.where(duration_col.notna(), '6-15 дней').tolist(),
+        all_hotels['offer_url'].tolist(),
+    )
+    def iter_table_rows():
+        for hotel_name, price, dates, duration, offer_url in table_columns:
+            # Δ 48ч
+            delta_display = "—"
+            delta_class = "delta flat"
+            delta_info = deltas_by_hotel.get(hotel_name)
+            if delta_info is not None:
+                delta_abs, delta_pct = delta_info
+                arrow = '↑' if delta_abs > 0 else ('↓' if delta_abs < 0 else '→')
+                delta_class = 'delta up' if delta_abs > 0 else ('delta down' if delta_abs < 0 else 'delta flat')
+                sign = '+' if delta_abs > 0 else ('' if delta_abs < 0 else '')
+                delta_display = f"{arrow} {sign}{delta_pct:.1f}%"
 
-        # Δ с начала наблюдений
-        since_display = "—"
-        since_info = since_start_delta.get(hotel_name)
-        if since_info is not None:
-            since_abs, since_pct = since_info
-            arrow2 = '↑' if since_abs > 0 else ('↓' if since_abs < 0 else '→')
-            sign2 = '+' if since_abs > 0 else ('' if since_abs < 0 else '')
-            since_display = f"{arrow2} {sign2}{since_pct:.1f}%"
+            # Δ с начала наблюдений
+            since_display = "—"
+            since_info = since_start_delta.get(hotel_name)
+            if since_info is not None:
+                since_abs, since_pct = since_info
+                arrow2 = '↑' if since_abs > 0 else ('↓' if since_abs < 0 else '→')
+                sign2 = '+' if since_abs > 0 else ('' if since_abs < 0 else '')
+                since_display = f"{arrow2} {sign2}{since_pct:.1f}%"
 
-        hotel_slug = slugify(hotel_name)
-        # Строим ссылку на страницу графика, учитывая поддиректорию
-        if charts_subdir:
-            chart_href = f"{charts_subdir.rstrip('/')}/{hotel_slug}.html"
-        else:
-            chart_href = f"hotel-charts/{hotel_slug}.html"
+            hotel_slug = slugify(hotel_name)
+            # Строим ссылку на страницу графика, учитывая поддиректорию
+            if charts_subdir:
+                chart_href = f"{charts_subdir.rstrip('/')}/{hotel_slug}.html"
+            else:
+                chart_href = f"hotel-charts/{hotel_slug}.html"
         
-        # Откат: не вычисляем аэропорт и альтернативы
+            # Откат: не вычисляем аэропорт и альтернативы
         
-        # Ссылка на предложение
-        offer_url = hotel.get('offer_url', '')
-        offer_link_html = ""
-        if offer_url and pd.notna(offer_url) and offer_url.strip():
-            offer_link_html = f'<a href="{offer_url}" target="_blank" class="offer-link">🔗</a>'
-        else:
-            offer_link_html = "—"
+            # Ссылка на предложение
+            offer_link_html = ""
+            if offer_url and pd.notna(offer_url) and offer_url.strip():
+                offer_link_html = f'<a href="{offer_url}" target="_blank" class="offer-link">🔗</a>'
+            else:
+                offer_link_html = "—"
         
-        html_template += f"""
-                    <tr>
-                        <td class="hotel-name"><a class=\"open-chart-link\" href=\"{chart_href}\" target=\"_blank\" onmouseover=\"_hoverPreview.show(event,'{hotel_name}')\" onmouseout=\"_hoverPreview.hide()\">{hotel_name}</a></td>
-                        <td class="price" data-sort-value="{price}">{price:.0f} PLN</td>
-                        <td class=\"{delta_class}\" data-sort-value="{delta_info[1] if delta_info else 0}">{delta_display}</td>
-                        <td data-sort-value="{since_info[1] if since_info else 0}">{since_display}</td>
-                        <td data-sort-value="{dates}">{dates}</td>
-                        <td data-sort-value="{duration}">{duration}</td>
-                        
-                        <td class="offer-link-cell">{offer_link_html}</td>
-                    </tr>"""
+            yield TABLE_ROW_TPL.format_map({
+                'chart_href': chart_href,
+                'hotel_name': hotel_name,
+                'price': price,
+                'delta_class': delta_class,
+                'delta_sort': delta_info[1] if delta_info else 0,
+                'delta_display': delta_display,
+                'since_sort': since_info[1] if since_info else 0,
+                'since_display': since_display,
+                'dates': dates,
+                'duration': duration,
+                'offer_link_html': offer_link_html,
+            })
+    html_parts.append(iter_table_rows())
 
     # Завершаем таблицу и добавляем секцию для графика
-    html_template += f"""
+    html_parts.append(f"""
                 </tbody>
             </table>
             </div>
@@ -2122,23 +1888,20 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
         </div>
     </div>
     <div id="hoverThumb" class="hover-thumb"><img id="hoverImg" src="" alt="preview"/></div>
-"""
+""")
 
     # Вставляем скрипт превью слиянием JSON вне f-строки, чтобы избежать конфликтов с фигурными скобками
-    html_template += """
+    html_parts.append("""
     <script>
       (function(){
         const X = """ + json.dumps(top10_x_values, ensure_ascii=False) + """;
         const Y = """ + json.dumps(top10_y_values, ensure_ascii=False) + """;
-        const detailedData = """ + json.dumps(top10_detailed_data, ensure_ascii=False, default=str) + """;
+        // Графику нужны только подсказки — остальные поля top10_detailed_data в страницу не попадают
+        const hoverData = """ + json.dumps([d.get('hover_data') or {} for d in top10_detailed_data], ensure_ascii=False) + """;
         
         if (Array.isArray(X) && Array.isArray(Y) && X.length > 0 && Y.length > 0 && window.Plotly) {
-          // Подготавливаем данные для hover
-          const hoverData = detailedData.map(data => data.hover_data || {});
-          
           // Создаем простой текст для hover с правильными переносами строк
-          const hoverTexts = detailedData.map((data, index) => {
-            const hover = data.hover_data || {};
+          const hoverTexts = hoverData.map((hover, index) => {
             let text = hover.title || '';
             
             // Добавляем среднюю цену
@@ -2218,7 +1981,7 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
       (function(){
         const trendIndexX = """ + json.dumps(trend_index_x_values, ensure_ascii=False) + """;
         const trendIndexY = """ + json.dumps(trend_index_y_values, ensure_ascii=False) + """;
-        const trendIndexDetailedData = """ + json.dumps(trend_index_detailed_data, ensure_ascii=False, default=str) + """;
+        const trendIndexDetailedData = """ + json.dumps(trend_index_detailed_data, ensure_ascii=False) + """;
         
         if (Array.isArray(trendIndexX) && Array.isArray(trendIndexY) && trendIndexX.length > 0 && trendIndexY.length > 0 && window.Plotly) {
           // Создаем hover текст для каждой точки
@@ -2517,10 +2280,10 @@ def generate_inline_charts_dashboard(data_file: str = 'data/travel_prices.csv',
     </script>
   </body>
 </html>
-"""
+""")
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html_template)
+    write_html(output_file, html_parts)
+    save_cache_key(output_file, cache_key)
     
     print(f"✅ Дашборд с встроенными графиками сгенерирован: index.html")
     print(f"📊 Статистика: {total_offers} предложений, {unique_hotels} отелей")
@@ -2537,5 +2300,6 @@ if __name__ == "__main__":
     parser.add_argument('--tz', default='Europe/Warsaw')
     parser.add_argument('--alerts-file', default=None)
     parser.add_argument('--all-airports-data-file', default=None, help='CSV с общим фильтром (любой аэропорт) для сравнения')
+    parser.add_argument('--force', action='store_true', help='Генерировать даже если входные данные не изменились')
     args = parser.parse_args()
-    generate_inline_charts_dashboard(data_file=args.data_file, output_file=args.output, title=args.title, charts_subdir=args.charts_dir, tz=args.tz, alerts_file=args.alerts_file, all_airports_data_file=args.all_airports_data_file)
+    generate_inline_charts_dashboard(data_file=args.data_file, output_file=args.output, title=args.title, charts_subdir=args.charts_dir, tz=args.tz, alerts_file=args.alerts_file, all_airports_data_file=args.all_airports_data_file, force=args.force)
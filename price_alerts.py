@@ -4,119 +4,295 @@
 """
 
 import pandas as pd
+import numpy as np
 import json
 import os
 import csv
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Iterator
 import logging
 
+try:
+    import pyarrow  # необязательная зависимость: многопоточный парсер CSV для pd.read_csv
+except ImportError:
+    pyarrow = None
+
+try:
+    import orjson  # необязательная зависимость: быстрее читает и пишет историю алертов
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+
+def _load_json(path: str) -> Any:
+    """Читает JSON-файл (через orjson, если он установлен)"""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def dump_json(path: str, data: Any):
+    """Пишет JSON с отступом в 2 пробела (через orjson, если он установлен)"""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+
+
+def _iter_json_lines(path: str) -> Iterator[Any]:
+    """Построчно читает JSON Lines (одна запись на строку); битые строки (например, недописанные) пропускает"""
+    with open(path, 'rb') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield orjson.loads(line) if orjson is not None else json.loads(line)
+            except ValueError as e:
+                logger.warning(f"Пропущена битая строка {line_no} в {path}: {e}")
+
+
+def _write_json_lines(path: str, records: List[Any], append: bool = True):
+    """Дописывает (или перезаписывает при append=False) записи в JSON Lines"""
+    with open(path, 'ab' if append else 'wb') as f:
+        for record in records:
+            if orjson is not None:
+                f.write(orjson.dumps(record, default=str, option=orjson.OPT_SERIALIZE_NUMPY) + b'\n')
+            else:
+                f.write((json.dumps(record, ensure_ascii=False, default=str) + '\n').encode('utf-8'))
+
+
+def _hotel_time_order(df: pd.DataFrame):
+    """Стабильный порядок строк df по отелям (в порядке появления), внутри отеля — по времени.
+
+    Возвращает (order, codes, hotel_names); строки без названия отеля отбрасываются.
+    """
+    hotel_codes, hotel_names = pd.factorize(df['hotel_name'])
+    times = df['scraped_at'].values
+    if np.all(hotel_codes[1:] >= hotel_codes[:-1]) \
+            and not np.any((hotel_codes[1:] == hotel_codes[:-1]) & (times[1:] < times[:-1])):
+        # Уже отсортировано (load_data сортирует один раз при загрузке) — пересортировка не нужна
+        order = np.arange(len(df))
+    else:
+        order = np.lexsort((times, hotel_codes))
+    order = order[hotel_codes[order] >= 0]
+    return order, hotel_codes[order], pd.Index(hotel_names)
+
+
+def _price_change_alerts(df: pd.DataFrame, order: np.ndarray, codes: np.ndarray,
+                         threshold_percent: float) -> List[Dict[str, Any]]:
+    """Алерты по изменениям цены между соседними записями одного отеля в порядке order"""
+    # Арифметику ведем в float64, чтобы проценты и unique_key не зависели от хранения цены в float32
+    prices = df['price'].to_numpy(dtype='float64')[order]
+    
+    # Изменения между всеми соседними записями; пары разных отелей отсекаем по смене кода отеля
+    prev_prices, curr_prices = prices[:-1], prices[1:]
+    price_changes = curr_prices - prev_prices
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price_changes_pct = np.where(prev_prices > 0, price_changes / prev_prices * 100, 0.0)
+    hits = np.flatnonzero((codes[1:] == codes[:-1]) & ~np.isnan(prev_prices)
+                          & (np.abs(price_changes_pct) >= threshold_percent))
+    if not hits.size:
+        return []
+    rows = order[hits + 1]
+    hotel_names = df['hotel_name'].iloc[rows].astype(str).to_numpy(dtype=object)
+    curr_dates = df['scraped_at'].iloc[rows]
+    
+    # Уникальные ключи для дедупликации собираем сразу для всех алертов:
+    # отель_ГГГГ-ММ-ДД_ЧЧ-ММ_процент (процент через '%.1f' — так же, как округлял f-string)
+    unique_keys = (hotel_names + '_' + curr_dates.dt.strftime('%Y-%m-%d_%H-%M').to_numpy(dtype=object)
+                   + '_' + np.char.mod('%.1f', price_changes_pct[hits]).astype(object))
+    
+    alerts = []
+    created_at = datetime.now().isoformat()
+    for hotel_name, prev_price, curr_price, price_change, price_change_pct, curr_date, unique_key in zip(
+            hotel_names.tolist(), prev_prices[hits].tolist(),
+            curr_prices[hits].tolist(), price_changes[hits].tolist(),
+            price_changes_pct[hits].tolist(), curr_dates, unique_keys.tolist()):
+        alert = {
+            'hotel_name': hotel_name,
+            'old_price': prev_price,
+            'new_price': curr_price,
+            'price_change': price_change,
+            'price_change_pct': price_change_pct,
+            'timestamp': curr_date.isoformat(),
+            'alert_type': 'price_drop' if price_change < 0 else 'price_increase',
+            'created_at': created_at,
+            'threshold_percent': threshold_percent,
+            'unique_key': unique_key
+        }
+        alerts.append(alert)
+    
+    return alerts
+
+
 class PriceAlertManager:
-    def __init__(self, data_file="data/travel_prices.csv", alerts_file="data/price_alerts_history.json"):
+    """Алерты об изменениях цен.
+
+    История алертов в файле *.jsonl хранится построчно (новые алерты дописываются в конец),
+    в файле *.json — прежним JSON-списком.
+    """
+    def __init__(self, data_file="data/travel_prices.csv", alerts_file="data/price_alerts_history.jsonl"):
         self.data_file = data_file
         self.alerts_file = alerts_file
+        self._jsonl = alerts_file.endswith('.jsonl')
+        if self._jsonl:
+            self._migrate_legacy_alerts()
+        # Кэш результатов check_price_changes: (id(df), порог) -> алерты; сбрасывается в load_data
+        self._changes_cache = {}
+        # Порядок строк по отелям и границы отелей: (id(df), данные) — см. _hotel_order
+        self._hotel_order_cache = None
+        # unique_key сохраненных алертов: читаются из файла один раз, дальше пополняются при сохранении
+        self._existing_keys = None
         self.df = self.load_data()
         
     def load_data(self) -> pd.DataFrame:
-        """Загружает данные из CSV файла"""
+        """Загружает данные из CSV файла.
+
+        Если установлен pyarrow, разобранные данные кэшируются в parquet рядом с CSV
+        и читаются оттуда, пока CSV не изменится.
+        """
+        self._changes_cache = {}
+        self._hotel_order_cache = None
         if not os.path.exists(self.data_file):
             return pd.DataFrame()
         
+        cache_file = self.data_file + '.parquet'
+        if pyarrow is not None and os.path.exists(cache_file) \
+                and os.path.getmtime(cache_file) >= os.path.getmtime(self.data_file):
+            try:
+                return pd.read_parquet(cache_file)
+            except Exception as e:
+                logger.warning(f"Не удалось прочитать кэш {cache_file}, читаем CSV: {e}")
+        
         try:
-            df = pd.read_csv(self.data_file, quoting=csv.QUOTE_ALL, on_bad_lines='skip')
+            df = self._read_csv()
             # Используем robust парсинг дат как в других файлах
             df['scraped_at'] = pd.to_datetime(df['scraped_at'], errors='coerce', utc=True)
             df = df.dropna(subset=['scraped_at'])
+            # Цены — целые PLN (extract_price округляет до злотого), точно помещаются в float32; названия отелей повторяются — храним как category
+            df['price'] = pd.to_numeric(df['price'], errors='coerce', downcast='float')
+            df['hotel_name'] = df['hotel_name'].astype('category')
+            # Сортируем один раз: отели в порядке появления, внутри отеля — по времени
+            hotel_codes, _ = pd.factorize(df['hotel_name'])
+            df = df.iloc[np.lexsort((df['scraped_at'].values, hotel_codes))].reset_index(drop=True)
+            if pyarrow is not None:
+                try:
+                    df.to_parquet(cache_file, index=False)
+                except Exception as e:
+                    logger.warning(f"Не удалось сохранить кэш {cache_file}: {e}")
             return df
         except Exception as e:
             logger.error(f"Ошибка загрузки данных: {e}")
             return pd.DataFrame()
     
+    def _read_csv(self) -> pd.DataFrame:
+        """Читает CSV через pyarrow (если установлен), иначе — стандартным парсером с пропуском битых строк"""
+        if pyarrow is not None:
+            try:
+                return pd.read_csv(self.data_file, engine='pyarrow')
+            except Exception as e:
+                # pyarrow не умеет пропускать битые строки — в этом случае читаем обычным парсером
+                logger.warning(f"pyarrow не смог прочитать {self.data_file}, используем стандартный парсер: {e}")
+        return pd.read_csv(self.data_file, quoting=csv.QUOTE_ALL, on_bad_lines='skip')
+    
+    def _migrate_legacy_alerts(self):
+        """Один раз переносит историю из прежнего JSON-файла (то же имя с .json) в JSON Lines"""
+        legacy_file = os.path.splitext(self.alerts_file)[0] + '.json'
+        if os.path.exists(self.alerts_file) or not os.path.exists(legacy_file):
+            return
+        try:
+            data = _load_json(legacy_file)
+            alerts = data.get('alerts', []) if isinstance(data, dict) else data
+            _write_json_lines(self.alerts_file, alerts if isinstance(alerts, list) else [], append=False)
+            logger.info(f"История алертов перенесена из {legacy_file} в {self.alerts_file}")
+        except Exception as e:
+            logger.error(f"Ошибка переноса истории алертов из {legacy_file}: {e}")
+    
     def load_alerts(self) -> List[Dict[str, Any]]:
         """Загружает историю алертов"""
         if not os.path.exists(self.alerts_file):
             return []
         
         try:
-            with open(self.alerts_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # Если это старая структура с "alerts" ключом
-                if isinstance(data, dict) and 'alerts' in data:
-                    return data['alerts']
-                # Если это уже список
-                elif isinstance(data, list):
-                    return data
-                else:
-                    return []
+            if self._jsonl:
+                return list(_iter_json_lines(self.alerts_file))
+            data = _load_json(self.alerts_file)
+            # Если это старая структура с "alerts" ключом
+            if isinstance(data, dict) and 'alerts' in data:
+                return data['alerts']
+            # Если это уже список
+            elif isinstance(data, list):
+                return data
+            else:
+                return []
         except Exception as e:
             logger.error(f"Ошибка загрузки алертов: {e}")
             return []
     
     def save_alerts(self, alerts: List[Dict[str, Any]]):
         """Сохраняет алерты в файл"""
+        self._existing_keys = None
         try:
-            with open(self.alerts_file, 'w', encoding='utf-8') as f:
-                json.dump(alerts, f, indent=2, ensure_ascii=False, default=str)
+            if self._jsonl:
+                _write_json_lines(self.alerts_file, alerts, append=False)
+            else:
+                dump_json(self.alerts_file, alerts)
         except Exception as e:
             logger.error(f"Ошибка сохранения алертов: {e}")
     
+    def _hotel_order(self):
+        """Порядок строк df по отелям (в порядке появления), внутри отеля — по времени.
+
+        Считается один раз на df вместо фильтрации по каждому отелю. Возвращает
+        (order, codes, offsets, hotel_names): строки отеля k — order[offsets[k]:offsets[k + 1]].
+        """
+        key = id(self.df)
+        if self._hotel_order_cache is None or self._hotel_order_cache[0] != key:
+            order, codes, hotel_names = _hotel_time_order(self.df)
+            offsets = np.r_[0, np.flatnonzero(np.diff(codes)) + 1, len(codes)]
+            self._hotel_order_cache = (key, (order, codes, offsets, hotel_names))
+        return self._hotel_order_cache[1]
+    
     def check_price_changes(self, threshold_percent: float = 4.0) -> List[Dict[str, Any]]:
         """Проверяет изменения цен между всеми соседними записями и возвращает алерты"""
         if self.df.empty:
             return []
         
-        alerts = []
-        
-        # Группируем по отелям
-        for hotel_name in self.df['hotel_name'].unique():
-            hotel_data = self.df[self.df['hotel_name'] == hotel_name].sort_values('scraped_at')
-            
-            if len(hotel_data) < 2:
-                continue
-            
-            # Проверяем изменения между всеми соседними записями
-            for i in range(1, len(hotel_data)):
-                prev_price = hotel_data.iloc[i-1]['price']
-                curr_price = hotel_data.iloc[i]['price']
-                prev_date = hotel_data.iloc[i-1]['scraped_at']
-                curr_date = hotel_data.iloc[i]['scraped_at']
-                
-                # Вычисляем изменение
-                price_change = curr_price - prev_price
-                price_change_pct = (price_change / prev_price) * 100 if prev_price > 0 else 0
-                
-                # Проверяем, превышает ли изменение порог
-                if abs(price_change_pct) >= threshold_percent:
-                    alert = {
-                        'hotel_name': hotel_name,
-                        'old_price': prev_price,
-                        'new_price': curr_price,
-                        'price_change': price_change,
-                        'price_change_pct': price_change_pct,
-                        'timestamp': curr_date.isoformat(),
-                        'alert_type': 'price_drop' if price_change < 0 else 'price_increase',
-                        'created_at': datetime.now().isoformat(),
-                        'threshold_percent': threshold_percent,
-                        # Уникальный ключ для дедупликации
-                        'unique_key': f"{hotel_name}_{curr_date.strftime('%Y-%m-%d_%H-%M')}_{price_change_pct:.1f}"
-                    }
-                    alerts.append(alert)
-        
-        return alerts
+        order, codes, _, _ = self._hotel_order()
+        return _price_change_alerts(self.df, order, codes, threshold_percent)
+    
+    def _known_keys(self) -> Set[str]:
+        """unique_key уже сохраненных алертов (файл читается только при первом обращении)"""
+        if self._existing_keys is None:
+            if self._jsonl and os.path.exists(self.alerts_file):
+                # JSON Lines читаем потоково: в памяти остаются только ключи, а не вся история
+                try:
+                    self._existing_keys = {alert.get('unique_key') for alert in _iter_json_lines(self.alerts_file)
+                                           if isinstance(alert, dict) and 'unique_key' in alert}
+                except Exception as e:
+                    logger.error(f"Ошибка загрузки алертов: {e}")
+                    self._existing_keys = set()
+            else:
+                self._existing_keys = {alert.get('unique_key') for alert in self.load_alerts() if 'unique_key' in alert}
+        return self._existing_keys
     
     def deduplicate_alerts(self, new_alerts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Удаляет дубликаты алертов на основе unique_key"""
-        existing_alerts = self.load_alerts()
-        existing_keys = {alert.get('unique_key') for alert in existing_alerts if 'unique_key' in alert}
+        existing_keys = self._known_keys()
         
-        # Фильтруем новые алерты, оставляя только уникальные
+        # Фильтруем новые алерты, оставляя только уникальные (в том числе внутри самого списка)
+        seen_keys = set()
         unique_new_alerts = []
         for alert in new_alerts:
-            if alert.get('unique_key') not in existing_keys:
+            key = alert.get('unique_key')
+            if key not in existing_keys and key not in seen_keys:
                 unique_new_alerts.append(alert)
-                existing_keys.add(alert.get('unique_key'))
+                seen_keys.add(key)
         
         return unique_new_alerts
     
@@ -125,56 +301,151 @@ class PriceAlertManager:
         if not new_alerts:
             return
         
-        # Загружаем существующие алерты
-        existing_alerts = self.load_alerts()
-        
-        # Дедуплицируем новые алерты
+        # Дедуплицируем новые алерты по ключам из памяти — без повторного чтения истории
         unique_new_alerts = self.deduplicate_alerts(new_alerts)
         
         if unique_new_alerts:
-            # Добавляем новые алерты к существующим
-            all_alerts = existing_alerts + unique_new_alerts
-            
-            # Сохраняем обновленный список
             try:
-                with open(self.alerts_file, 'w', encoding='utf-8') as f:
-                    json.dump(all_alerts, f, indent=2, ensure_ascii=False, default=str)
+                if self._jsonl:
+                    # JSON Lines: дописываем только новые алерты
+                    _write_json_lines(self.alerts_file, unique_new_alerts)
+                else:
+                    # JSON-список перезаписывается целиком вместе с существующими алертами
+                    dump_json(self.alerts_file, self.load_alerts() + unique_new_alerts)
+                self._known_keys().update(alert.get('unique_key') for alert in unique_new_alerts)
                 logger.info(f"Сохранено {len(unique_new_alerts)} новых алертов (пропущено {len(new_alerts) - len(unique_new_alerts)} дубликатов)")
             except Exception as e:
                 logger.error(f"Ошибка сохранения новых алертов: {e}")
         else:
             logger.info("Нет новых алертов для сохранения")
     
+    def _cached_price_changes(self, threshold_percent: float) -> List[Dict[str, Any]]:
+        """check_price_changes с кэшем на текущий df и порог (для снижений/повышений и отчета)"""
+        key = (id(self.df), threshold_percent)
+        if key not in self._changes_cache:
+            self._changes_cache[key] = self.check_price_changes(threshold_percent)
+        return self._changes_cache[key]
+    
     def get_price_drops(self, threshold_percent: float = 4.0) -> List[Dict[str, Any]]:
         """Возвращает только снижения цен"""
-        all_alerts = self.check_price_changes(threshold_percent)
+        all_alerts = self._cached_price_changes(threshold_percent)
         return [alert for alert in all_alerts if alert['price_change'] < 0]
     
     def get_price_increases(self, threshold_percent: float = 4.0) -> List[Dict[str, Any]]:
         """Возвращает только повышения цен"""
-        all_alerts = self.check_price_changes(threshold_percent)
+        all_alerts = self._cached_price_changes(threshold_percent)
         return [alert for alert in all_alerts if alert['price_change'] > 0]
     
-    def scan_all_price_changes(self, threshold_percent: float = 4.0) -> List[Dict[str, Any]]:
-        """Сканирует всю базу данных и находит все изменения цен >= порога"""
+    def _scan_state_file(self) -> str:
+        """Файл состояния инкрементального сканирования (рядом с файлом алертов)"""
+        return os.path.splitext(self.alerts_file)[0] + '_scan_state.json'
+    
+    def _load_scan_state(self, threshold_percent: float) -> Optional[Dict[str, Any]]:
+        """Состояние прошлого сканирования, если оно подходит к текущим данным и порогу"""
+        state_file = self._scan_state_file()
+        if not os.path.exists(state_file):
+            return None
+        try:
+            state = _load_json(state_file)
+            watermark = pd.Timestamp(state['max_scraped_at'])
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать состояние сканирования {state_file}: {e}")
+            return None
+        if state.get('data_file') != self.data_file or state.get('threshold_percent') != threshold_percent:
+            return None
+        # Файл данных заменили или обрезали — отметка больше не годится
+        if watermark > self.df['scraped_at'].max():
+            return None
+        return state
+    
+    def _save_scan_state(self, threshold_percent: float):
+        """Сохраняет отметку времени и последнюю цену каждого отеля для следующего сканирования"""
+        order, _, offsets, hotel_names = self._hotel_order()
+        last_rows = order[offsets[1:] - 1]
+        state = {
+            'data_file': self.data_file,
+            'threshold_percent': threshold_percent,
+            'max_scraped_at': self.df['scraped_at'].max().isoformat(),
+            'last_prices': {
+                hotel_name: [ts.isoformat(), price]
+                for hotel_name, ts, price in zip(
+                    hotel_names.tolist(), self.df['scraped_at'].iloc[last_rows],
+                    self.df['price'].to_numpy(dtype='float64')[last_rows].tolist())
+            },
+        }
+        try:
+            dump_json(self._scan_state_file(), state)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения состояния сканирования: {e}")
+    
+    def scan_all_price_changes(self, threshold_percent: float = 4.0, incremental: bool = True) -> List[Dict[str, Any]]:
+        """Находит изменения цен >= порога и сохраняет новые алерты.
+
+        В инкрементальном режиме (данные только дописываются) проверяются лишь записи новее
+        отметки прошлого сканирования: они сравниваются с последней известной ценой отеля.
+        Без сохраненного состояния сканируется вся база. Возвращает алерты этого сканирования.
+        """
         if self.df.empty:
             return []
         
-        logger.info(f"🔍 Сканируем всю базу данных на изменения >= {threshold_percent}%...")
-        all_alerts = self.check_price_changes(threshold_percent)
+        state = self._load_scan_state(threshold_percent) if incremental else None
+        if state is None:
+            logger.info(f"🔍 Сканируем всю базу данных на изменения >= {threshold_percent}%...")
+            all_alerts = self.check_price_changes(threshold_percent)
+        else:
+            watermark = pd.Timestamp(state['max_scraped_at'])
+            new_rows = self.df.loc[self.df['scraped_at'] > watermark, ['hotel_name', 'scraped_at', 'price']]
+            logger.info(f"🔍 Проверяем {len(new_rows)} новых записей (после {watermark}) на изменения >= {threshold_percent}%...")
+            if new_rows.empty:
+                # Новых записей нет — сравнивать не с чем
+                all_alerts = []
+            else:
+                # Последняя известная цена отеля идет первой в его группе — с ней сравнивается первая новая запись
+                new_hotels = set(new_rows['hotel_name'].dropna().tolist())
+                last_known = pd.DataFrame(
+                    [(hotel_name, pd.Timestamp(ts), price)
+                     for hotel_name, (ts, price) in state.get('last_prices', {}).items() if hotel_name in new_hotels],
+                    columns=['hotel_name', 'scraped_at', 'price'])
+                tail = new_rows.astype({'hotel_name': object})
+                if not last_known.empty:
+                    # Пустой last_known (все отели новые) в concat не передаем: он сбил бы типы колонок
+                    tail = pd.concat([last_known, tail], ignore_index=True)
+                else:
+                    tail = tail.reset_index(drop=True)
+                order, codes, _ = _hotel_time_order(tail)
+                all_alerts = _price_change_alerts(tail, order, codes, threshold_percent)
         
         # Сохраняем только новые алерты (с дедупликацией)
         self.save_new_alerts(all_alerts)
+        if incremental:
+            self._save_scan_state(threshold_percent)
         
         return all_alerts
     
+    @staticmethod
+    def _report_alert_blocks(alerts: List[Dict[str, Any]]) -> List[str]:
+        """Блоки отчета по алертам (номер, отель, цены, изменение, время) — форматируются сразу для всех"""
+        df = pd.DataFrame(alerts, columns=['hotel_name', 'old_price', 'new_price', 'price_change',
+                                           'price_change_pct', 'timestamp'])
+        numbers = np.arange(1, len(df) + 1).astype(str).astype(object)
+        blocks = (numbers + '. ' + df['hotel_name'].astype(str).str[:50]
+                  + '\n   Было: ' + np.char.mod('%.0f', df['old_price'].to_numpy(dtype='float64')).astype(object)
+                  + ' PLN → Стало: ' + np.char.mod('%.0f', df['new_price'].to_numpy(dtype='float64')).astype(object)
+                  + ' PLN\n   Изменение: ' + np.char.mod('%+.0f', df['price_change'].to_numpy(dtype='float64')).astype(object)
+                  + ' PLN (' + np.char.mod('%+.1f', df['price_change_pct'].to_numpy(dtype='float64')).astype(object)
+                  + '%)\n   Время: ' + df['timestamp'].astype(str).str[:19]
+                  + '\n')
+        return blocks.tolist()
+    
     def create_alert_report(self, threshold_percent: float = 4.0) -> str:
         """Создает отчет об изменениях цен"""
         if self.df.empty:
             return "❌ Нет данных для анализа"
         
-        price_drops = self.get_price_drops(threshold_percent)
-        price_increases = self.get_price_increases(threshold_percent)
+        # Изменения считаем один раз и делим на снижения и повышения
+        all_alerts = self._cached_price_changes(threshold_percent)
+        price_drops = [alert for alert in all_alerts if alert['price_change'] < 0]
+        price_increases = [alert for alert in all_alerts if alert['price_change'] > 0]
         
         report = []
         report.append("🚨 ОТЧЕТ ОБ ИЗМЕНЕНИЯХ ЦЕН")
@@ -186,12 +457,7 @@ class PriceAlertManager:
         if price_drops:
             report.append("📉 СНИЖЕНИЯ ЦЕН:")
             report.append("-" * 30)
-            for i, alert in enumerate(price_drops, 1):
-                report.append(f"{i}. {alert['hotel_name'][:50]}")
-                report.append(f"   Было: {alert['old_price']:.0f} PLN → Стало: {alert['new_price']:.0f} PLN")
-                report.append(f"   Изменение: {alert['price_change']:+.0f} PLN ({alert['price_change_pct']:+.1f}%)")
-                report.append(f"   Время: {alert['timestamp'][:19]}")
-                report.append("")
+            report.extend(self._report_alert_blocks(price_drops))
         else:
             report.append("📉 Снижений цен не обнаружено")
             report.append("")
@@ -199,12 +465,7 @@ class PriceAlertManager:
         if price_increases:
             report.append("📈 ПОВЫШЕНИЯ ЦЕН:")
             report.append("-" * 30)
-            for i, alert in enumerate(price_increases, 1):
-                report.append(f"{i}. {alert['hotel_name'][:50]}")
-                report.append(f"   Было: {alert['old_price']:.0f} PLN → Стало: {alert['new_price']:.0f} PLN")
-                report.append(f"   Изменение: {alert['price_change']:+.0f} PLN ({alert['price_change_pct']:+.1f}%)")
-                report.append(f"   Время: {alert['timestamp'][:19]}")
-                report.append("")
+            report.extend(self._report_alert_blocks(price_increases))
         else:
             report.append("📈 Повышений цен не обнаружено")
             report.append("")
@@ -224,26 +485,41 @@ class PriceAlertManager:
             logger.error(f"Ошибка сохранения отчета об алертах: {e}")
     
     def get_top_cheap_hotels_with_alerts(self, n: int = 15) -> List[Dict[str, Any]]:
-        """Возвращает топ самых дешевых отелей с информацией об изменениях цен"""
+        """Возвращает топ самых дешевых (по текущей цене) отелей с информацией об изменениях цен"""
         if self.df.empty:
             return []
         
-        # Получаем топ самых дешевых отелей
-        top_hotels = self.df.nsmallest(n, 'price')['hotel_name'].unique()
+        # Статистика по всем отелям одним проходом по заранее отсортированному порядку строк
+        order, codes, offsets, hotel_names = self._hotel_order()
+        if len(order) == 0:
+            return []
+        prices = self.df['price'].to_numpy(dtype='float64')[order]
+        price_groups = pd.Series(prices).groupby(codes)
+        stats = pd.DataFrame({
+            'first_price': prices[offsets[:-1]],
+            'last_price': prices[offsets[1:] - 1],
+            'min_price': price_groups.min().to_numpy(),
+            'max_price': price_groups.max().to_numpy(),
+            'avg_price': price_groups.mean().to_numpy(),
+            'records_count': np.diff(offsets),
+            'first_date': self.df['scraped_at'].iloc[order[offsets[:-1]]].to_numpy(dtype=object),
+            'last_date': self.df['scraped_at'].iloc[order[offsets[1:] - 1]].to_numpy(dtype=object),
+        })
+        
+        # Топ самых дешевых отелей по последней цене — выбор среди отелей, а не среди всех записей
+        top_codes = stats['last_price'].nsmallest(n).index.tolist()
+        stats = stats.to_dict('records')
         
         result = []
-        for hotel_name in top_hotels:
-            hotel_data = self.df[self.df['hotel_name'] == hotel_name].sort_values('scraped_at')
-            
-            if len(hotel_data) < 2:
+        for k in top_codes:
+            if stats[k]['records_count'] < 2:
                 continue
+            hotel_name = hotel_names[k]
             
-            # Получаем статистику по отелю
-            first_price = hotel_data.iloc[0]['price']
-            last_price = hotel_data.iloc[-1]['price']
-            min_price = hotel_data['price'].min()
-            max_price = hotel_data['price'].max()
-            avg_price = hotel_data['price'].mean()
+            # Статистика по отелю
+            hotel_stats = stats[k]
+            first_price = hotel_stats['first_price']
+            last_price = hotel_stats['last_price']
             
             price_change = last_price - first_price
             price_change_pct = (price_change / first_price) * 100 if first_price > 0 else 0
@@ -262,16 +538,16 @@ class PriceAlertManager:
             hotel_info = {
                 'hotel_name': hotel_name,
                 'current_price': last_price,
-                'min_price': min_price,
-                'max_price': max_price,
-                'avg_price': avg_price,
+                'min_price': hotel_stats['min_price'],
+                'max_price': hotel_stats['max_price'],
+                'avg_price': hotel_stats['avg_price'],
                 'price_change': price_change,
                 'price_change_pct': price_change_pct,
                 'status': status,
                 'status_color': status_color,
-                'records_count': len(hotel_data),
-                'first_date': hotel_data.iloc[0]['scraped_at'].isoformat(),
-                'last_date': hotel_data.iloc[-1]['scraped_at'].isoformat()
+                'records_count': hotel_stats['records_count'],
+                'first_date': hotel_stats['first_date'].isoformat(),
+                'last_date': hotel_stats['last_date'].isoformat()
             }
             
             result.append(hotel_info)
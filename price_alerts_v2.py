@@ -8,185 +8,405 @@
 """
 
 import pandas as pd
-import json
+import numpy as np
+import heapq
+import io
 import os
 import csv
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Set
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Set
 import logging
 
+try:
+    import pyarrow  # необязательная зависимость: многопоточный парсер CSV и parquet-кэш данных
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pyarrow = None
+    pa_csv = None
+
+from price_alerts import dump_json, _iter_json_lines, _load_json, _write_json_lines
+
 logger = logging.getLogger(__name__)
 
+# Разрыв между записями, после которого начинается новый ран: 5 минут в наносекундах
+RUN_GAP_NS = 5 * 60 * 10**9
+
 class PriceAlertManagerV2:
     def __init__(self, data_file="data/travel_prices.csv", alerts_file="data/price_alerts_history.json"):
         self.data_file = data_file
         self.alerts_file = alerts_file
+        # .jsonl — история в JSON Lines (новые алерты дописываются в конец), иначе — прежний JSON-список
+        self._jsonl = alerts_file.endswith('.jsonl')
+        if self._jsonl:
+            self._migrate_legacy_alerts()
+        # Раны считаются один раз на df: (id(df), данные) — см. _run_index; сбрасывается в load_data
+        self._run_index_cache = None
+        # unique_key сохраненных алертов: читаются из файла один раз, дальше пополняются при сохранении
+        self._existing_keys = None
+        # Результаты scan_all_runs_for_changes: {(id(df), порог): алерты}; сбрасывается в load_data
+        self._scan_cache = {}
         self.df = self.load_data()
         
     def load_data(self) -> pd.DataFrame:
-        """Загружает данные из CSV файла"""
+        """Загружает данные из CSV файла.
+
+        Если установлен pyarrow, разобранные данные хранятся в parquet рядом с CSV,
+        и при следующей загрузке из CSV дочитываются только дописанные строки.
+        """
+        self._run_index_cache = None
+        self._scan_cache = {}
         if not os.path.exists(self.data_file):
             return pd.DataFrame()
         
         try:
-            df = pd.read_csv(self.data_file, quoting=csv.QUOTE_ALL, on_bad_lines='skip')
-            # Исправляем парсинг дат - используем format='ISO8601' для правильного парсинга
-            df['scraped_at'] = pd.to_datetime(df['scraped_at'], errors='coerce', utc=True, format='ISO8601')
-            df = df.dropna(subset=['scraped_at'])
+            if pyarrow is not None:
+                df = self._load_incremental()
+            else:
+                df = self._prepare_columns(self._read_csv())
+            # CSV дописывается по времени, так что обычно данные уже отсортированы — сортируем только если нет
+            if not df['scraped_at'].is_monotonic_increasing:
+                df = df.sort_values('scraped_at', kind='mergesort', ignore_index=True)
             return df
         except Exception as e:
             logger.error(f"Ошибка загрузки данных: {e}")
             return pd.DataFrame()
     
+    @staticmethod
+    def _prepare_columns(df: pd.DataFrame) -> pd.DataFrame:
+        """Приводит типы колонок: разбирает scraped_at (строки с некорректной датой отбрасываются),
+        цену хранит в float32, название отеля — как category"""
+        # Исправляем парсинг дат - используем format='ISO8601' для правильного парсинга
+        df['scraped_at'] = pd.to_datetime(df['scraped_at'], errors='coerce', utc=True, format='ISO8601')
+        df = df.dropna(subset=['scraped_at'])
+        # Цены — целые PLN (extract_price округляет до злотого), точно помещаются в float32;
+        # арифметика алертов идет в float64
+        df['price'] = pd.to_numeric(df['price'], errors='coerce', downcast='float')
+        df['hotel_name'] = df['hotel_name'].astype('category')
+        return df
+    
+    def _load_incremental(self) -> pd.DataFrame:
+        """Читает parquet-кэш и дочитывает из CSV только байты, дописанные после прошлой загрузки.
+
+        В attrs кэша хранятся размер CSV, его заголовок и последние байты на момент сохранения:
+        если CSV стал короче или его начало изменилось (файл перезаписан), он читается целиком.
+        """
+        parquet_file = os.path.splitext(self.data_file)[0] + '.parquet'
+        csv_size = os.path.getsize(self.data_file)
+        with open(self.data_file, 'rb') as f:
+            header = f.readline()
+        
+        df = None
+        if os.path.exists(parquet_file):
+            try:
+                cached = pd.read_parquet(parquet_file)
+                state = cached.attrs.get('csv_state') or {}
+                offset = state.get('size', 0)
+                tail = bytes.fromhex(state.get('tail', ''))
+                if state.get('header') == header.hex() and len(header) < offset <= csv_size:
+                    with open(self.data_file, 'rb') as f:
+                        f.seek(offset - len(tail))
+                        if f.read(len(tail)) == tail:
+                            if offset == csv_size:
+                                return cached
+                            new_rows = self._read_csv_tail(f.read(), next(csv.reader([header.decode('utf-8')])))
+                            df = pd.concat([cached, self._prepare_columns(new_rows)], ignore_index=True)
+                            df['hotel_name'] = df['hotel_name'].astype('category')
+                            logger.info(f"Из {self.data_file} дочитано {len(new_rows)} новых записей")
+            except Exception as e:
+                logger.warning(f"Не удалось использовать кэш {parquet_file}, читаем CSV целиком: {e}")
+                df = None
+        if df is None:
+            df = self._prepare_columns(self._read_csv()).reset_index(drop=True)
+        
+        with open(self.data_file, 'rb') as f:
+            f.seek(max(csv_size - 256, 0))
+            tail = f.read(csv_size - f.tell())
+        df.attrs['csv_state'] = {'size': csv_size, 'header': header.hex(), 'tail': tail.hex()}
+        try:
+            df.to_parquet(parquet_file, index=False)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить кэш {parquet_file}: {e}")
+        return df
+    
+    # Для алертов нужны только эти колонки — остальные (url, dates, ...) не разбираем
+    CSV_COLUMNS = ['hotel_name', 'price', 'scraped_at']
+    
+    def _read_csv(self) -> pd.DataFrame:
+        """Читает нужные колонки CSV через pyarrow (если установлен), иначе — стандартным парсером"""
+        # Названия отелей повторяются в каждом ране — сразу читаем их как category
+        dtype = {'hotel_name': 'category'}
+        if pyarrow is not None:
+            try:
+                return pd.read_csv(self.data_file, engine='pyarrow', usecols=self.CSV_COLUMNS, dtype=dtype)
+            except Exception as e:
+                # pyarrow не умеет пропускать битые строки — в этом случае читаем обычным парсером
+                logger.warning(f"pyarrow не смог прочитать {self.data_file}, используем стандартный парсер: {e}")
+        return pd.read_csv(self.data_file, usecols=self.CSV_COLUMNS, dtype=dtype,
+                           quoting=csv.QUOTE_ALL, on_bad_lines='skip')
+    
+    def _migrate_legacy_alerts(self):
+        """Один раз переносит историю из прежнего JSON-файла (то же имя с .json) в JSON Lines"""
+        legacy_file = os.path.splitext(self.alerts_file)[0] + '.json'
+        if os.path.exists(self.alerts_file) or not os.path.exists(legacy_file):
+            return
+        try:
+            data = _load_json(legacy_file)
+            alerts = data.get('alerts', []) if isinstance(data, dict) else data
+            _write_json_lines(self.alerts_file, alerts if isinstance(alerts, list) else [], append=False)
+            logger.info(f"История алертов перенесена из {legacy_file} в {self.alerts_file}")
+        except Exception as e:
+            logger.error(f"Ошибка переноса истории алертов из {legacy_file}: {e}")
+    
+    def _read_csv_tail(self, data: bytes, names: List[str]) -> pd.DataFrame:
+        """Разбирает дописанный кусок CSV (без заголовка), материализуя только нужные колонки.
+
+        pyarrow.csv отбрасывает лишние колонки (url, dates, ...) еще при разборе и пропускает битые строки;
+        если он не справился, кусок читается стандартным парсером.
+        """
+        try:
+            table = pa_csv.read_csv(
+                io.BytesIO(data),
+                read_options=pa_csv.ReadOptions(column_names=names),
+                parse_options=pa_csv.ParseOptions(invalid_row_handler=lambda row: 'skip'),
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=self.CSV_COLUMNS, strings_can_be_null=True,
+                    column_types={'hotel_name': pyarrow.string(), 'scraped_at': pyarrow.string()}))
+            return table.to_pandas()
+        except Exception as e:
+            logger.warning(f"pyarrow не смог разобрать новые строки {self.data_file}, используем стандартный парсер: {e}")
+        return pd.read_csv(io.BytesIO(data), header=None, names=names, usecols=self.CSV_COLUMNS,
+                           quoting=csv.QUOTE_ALL, on_bad_lines='skip')
+    
     def load_alerts(self) -> List[Dict[str, Any]]:
         """Загружает историю алертов"""
         if not os.path.exists(self.alerts_file):
             return []
         
         try:
-            with open(self.alerts_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if isinstance(data, dict) and 'alerts' in data:
-                    return data['alerts']
-                elif isinstance(data, list):
-                    return data
-                else:
-                    return []
+            if self._jsonl:
+                return list(_iter_json_lines(self.alerts_file))
+            data = _load_json(self.alerts_file)
+            if isinstance(data, dict) and 'alerts' in data:
+                return data['alerts']
+            elif isinstance(data, list):
+                return data
+            else:
+                return []
         except Exception as e:
             logger.error(f"Ошибка загрузки алертов: {e}")
             return []
     
     def save_alerts(self, alerts: List[Dict[str, Any]]):
-        """Сохраняет алерты в файл"""
+        """Сохраняет алерты в файл (перезаписывает всю историю)"""
+        self._existing_keys = None
         try:
-            with open(self.alerts_file, 'w', encoding='utf-8') as f:
-                json.dump(alerts, f, indent=2, ensure_ascii=False, default=str)
+            if self._jsonl:
+                _write_json_lines(self.alerts_file, alerts, append=False)
+            else:
+                dump_json(self.alerts_file, alerts)
         except Exception as e:
             logger.error(f"Ошибка сохранения алертов: {e}")
     
+    def append_alerts(self, new_alerts: List[Dict[str, Any]]):
+        """Добавляет новые алерты к истории: в JSON Lines дописывает только их, JSON-список перезаписывает"""
+        if not self._jsonl:
+            self.save_alerts(self.load_alerts() + new_alerts)
+            return
+        try:
+            _write_json_lines(self.alerts_file, new_alerts)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения алертов: {e}")
+            self._existing_keys = None
+            return
+        if self._existing_keys is not None:
+            self._existing_keys.update(alert.get('unique_key') for alert in new_alerts if alert.get('unique_key'))
+    
+    def _run_index(self):
+        """Отсортированные по времени данные и раны (интервалы > 5 минут) — считаются один раз на df.
+
+        Возвращает (df_sorted, runs, run_slices): df_sorted с колонкой run_id (номер рана),
+        runs — [(время начала, start, end), ...], run_slices — {время начала рана: (start, end)} для поиска рана за O(1).
+        """
+        key = id(self.df)
+        if self._run_index_cache is None or self._run_index_cache[0] != key:
+            # Используем ту же логику, что и в дашбордах - группировка по интервалам > 5 минут
+            if self.df['scraped_at'].is_monotonic_increasing:
+                # load_data уже отсортировал — только новый RangeIndex для позиционных срезов
+                df_sorted = self.df.reset_index(drop=True)
+            else:
+                df_sorted = self.df.sort_values('scraped_at', kind='mergesort', ignore_index=True)
+            # Границы ранов по int64-наносекундам, без промежуточной колонки Timedelta
+            # (astype — на случай другой единицы, например микросекунд после чтения parquet)
+            ts = df_sorted['scraped_at'].values.astype('datetime64[ns]', copy=False).view('int64')
+            boundaries = np.flatnonzero(np.diff(ts) > RUN_GAP_NS) + 1
+            df_sorted['run_id'] = np.searchsorted(boundaries, np.arange(len(df_sorted)), side='right').astype(np.int32)
+            run_boundaries = boundaries.tolist()
+            run_starts = [0] + run_boundaries
+            run_ends = run_boundaries + [len(df_sorted)]
+            run_times = df_sorted['scraped_at'].iloc[run_starts[:len(df_sorted)]].tolist()
+            runs = [(run_time, start, end)
+                    for run_time, start, end in zip(run_times, run_starts, run_ends) if end > start]
+            run_slices = {}
+            for run_time, start, end in runs:
+                run_slices.setdefault(run_time, (start, end))
+            self._run_index_cache = (key, (df_sorted, runs, run_slices))
+        return self._run_index_cache[1]
+    
     def get_run_times(self) -> List[datetime]:
         """Получает все времена ранов (по интервалам > 5 минут)"""
         if self.df.empty:
             return []
         
-        # Используем ту же логику, что и в дашбордах - группировка по интервалам > 5 минут
-        df_sorted = self.df.sort_values('scraped_at')
-        df_sorted['time_diff'] = df_sorted['scraped_at'].diff()
-        run_boundaries = df_sorted[df_sorted['time_diff'] > pd.Timedelta(minutes=5)].index.tolist()
-        
-        # Добавляем начало и конец данных
-        run_starts = [0] + run_boundaries
-        run_ends = run_boundaries + [len(df_sorted)]
+        _, runs, _ = self._run_index()
+        return sorted(run_time for run_time, _, _ in runs)
+    
+    def _run_prices(self, run_time: datetime) -> pd.Series:
+        """Последняя цена каждого отеля в ране: Series с индексом по названию отеля"""
+        if self.df.empty:
+            return pd.Series(dtype='float64')
         
-        # Получаем времена начала каждого рана
-        run_times = []
-        for start_idx, end_idx in zip(run_starts, run_ends):
-            run_data_slice = df_sorted.iloc[start_idx:end_idx]
-            if len(run_data_slice) > 0:
-                run_time = run_data_slice['scraped_at'].iloc[0]
-                run_times.append(run_time)
+        # Находим нужный ран по заранее посчитанным границам
+        df_sorted, _, run_slices = self._run_index()
+        if run_time not in run_slices:
+            return pd.Series(dtype='float64')
+        start, end = run_slices[run_time]
+        run_data_slice = df_sorted.iloc[start:end]
         
-        return sorted(run_times)
+        # Берем последнюю цену для каждого отеля в этом ране (срез уже отсортирован по времени)
+        return run_data_slice.groupby('hotel_name', sort=False, observed=True)['price'].last()
     
     def get_hotel_prices_for_run(self, run_time: datetime) -> Dict[str, float]:
         """Получает цены всех отелей для конкретного рана"""
-        # Находим данные для этого рана используя ту же логику
-        df_sorted = self.df.sort_values('scraped_at')
-        df_sorted['time_diff'] = df_sorted['scraped_at'].diff()
-        run_boundaries = df_sorted[df_sorted['time_diff'] > pd.Timedelta(minutes=5)].index.tolist()
-        
-        # Добавляем начало и конец данных
-        run_starts = [0] + run_boundaries
-        run_ends = run_boundaries + [len(df_sorted)]
-        
-        # Находим нужный ран
-        run_data_slice = None
-        for start_idx, end_idx in zip(run_starts, run_ends):
-            slice_data = df_sorted.iloc[start_idx:end_idx]
-            if len(slice_data) > 0 and slice_data['scraped_at'].iloc[0] == run_time:
-                run_data_slice = slice_data
-                break
-        
-        if run_data_slice is None:
-            return {}
-        
-        # Берем последнюю цену для каждого отеля в этом ране
-        hotel_prices = {}
-        for hotel_name in run_data_slice['hotel_name'].unique():
-            hotel_data = run_data_slice[run_data_slice['hotel_name'] == hotel_name]
-            if not hotel_data.empty:
-                # Берем последнюю запись для этого отеля в этом ране
-                latest_price = hotel_data.sort_values('scraped_at').iloc[-1]['price']
-                hotel_prices[hotel_name] = latest_price
-        
-        return hotel_prices
+        return self._run_prices(run_time).to_dict()
     
-    def find_price_changes_between_runs(self, prev_run: datetime, curr_run: datetime, threshold_percent: float = 4.0) -> List[Dict[str, Any]]:
-        """Находит изменения цен между двумя ранами"""
-        prev_prices = self.get_hotel_prices_for_run(prev_run)
-        curr_prices = self.get_hotel_prices_for_run(curr_run)
+    def find_price_changes_between_runs(self, prev_run: datetime, curr_run: datetime, threshold_percent: float = 4.0,
+                                        created_at: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Находит изменения цен между двумя ранами (created_at по умолчанию — текущее время)"""
+        if created_at is None:
+            created_at = datetime.now(timezone.utc).isoformat()
+        
+        # Отели, которые есть в обоих ранах: внутреннее соединение по названию отеля
+        prev_prices, curr_prices = self._run_prices(prev_run).align(self._run_prices(curr_run), join='inner')
+        prev_values = prev_prices.to_numpy(dtype='float64')
+        curr_values = curr_prices.to_numpy(dtype='float64')
+        price_changes = curr_values - prev_values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_changes_pct = np.where(prev_values > 0, price_changes / prev_values * 100, 0.0)
+        hits = np.flatnonzero(~np.isnan(prev_values) & ~np.isnan(curr_values)
+                              & (np.abs(price_changes_pct) >= threshold_percent))
         
         changes = []
-        
-        # Проверяем изменения для отелей, которые есть в обоих ранах
-        for hotel_name in set(prev_prices.keys()) & set(curr_prices.keys()):
-            prev_price = prev_prices[hotel_name]
-            curr_price = curr_prices[hotel_name]
-            
-            price_change = curr_price - prev_price
-            price_change_pct = (price_change / prev_price) * 100 if prev_price > 0 else 0
-            
-            if abs(price_change_pct) >= threshold_percent:
-                changes.append({
-                    'hotel_name': hotel_name,
-                    'old_price': prev_price,
-                    'new_price': curr_price,
-                    'price_change': price_change,
-                    'price_change_pct': price_change_pct,
-                    'timestamp': curr_run,
-                    'alert_type': 'price_drop' if price_change < 0 else 'price_increase',
-                    'created_at': datetime.now(timezone.utc).isoformat(),
-                    'threshold_percent': threshold_percent,
-                    'unique_key': f"{hotel_name}_{curr_run.strftime('%Y-%m-%d_%H-%M')}_{price_change_pct:+.1f}"
-                })
+        # Метка рана для unique_key одна на все алерты пары — форматируем ее один раз
+        run_label = curr_run.strftime('%Y-%m-%d_%H-%M')
+        hotel_names = prev_prices.index.tolist()
+        for i in hits.tolist():
+            hotel_name = hotel_names[i]
+            price_change = float(price_changes[i])
+            price_change_pct = float(price_changes_pct[i])
+            changes.append({
+                'hotel_name': hotel_name,
+                'old_price': float(prev_values[i]),
+                'new_price': float(curr_values[i]),
+                'price_change': price_change,
+                'price_change_pct': price_change_pct,
+                'timestamp': curr_run,
+                'alert_type': 'price_drop' if price_change < 0 else 'price_increase',
+                'created_at': created_at,
+                'threshold_percent': threshold_percent,
+                'unique_key': f"{hotel_name}_{run_label}_{price_change_pct:+.1f}"
+            })
         
         return changes
     
-    def scan_all_runs_for_changes(self, threshold_percent: float = 4.0) -> List[Dict[str, Any]]:
-        """Сканирует все раны и находит все изменения цен >= порога"""
+    def scan_all_runs_for_changes(self, threshold_percent: float = 4.0,
+                                  created_at: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Сканирует все раны и находит все изменения цен >= порога.
+
+        created_at — общее время создания для всех алертов скана (по умолчанию — текущее время).
+        Результат кэшируется на текущий df и порог: повторный вызов (например, отчет после
+        process_all_changes) не сканирует заново и возвращает алерты с created_at первого скана.
+        """
         if self.df.empty:
             return []
-        
-        run_times = self.get_run_times()
-        if len(run_times) < 2:
+        key = (id(self.df), threshold_percent)
+        if key not in self._scan_cache:
+            if created_at is None:
+                created_at = datetime.now(timezone.utc).isoformat()
+            self._scan_cache[key] = self._scan_runs(threshold_percent, created_at)
+        return list(self._scan_cache[key])
+    
+    def _scan_runs(self, threshold_percent: float, created_at: str) -> List[Dict[str, Any]]:
+        """Все изменения цен >= порога между соседними ранами (без кэша)"""
+        df_sorted, runs, _ = self._run_index()
+        if len(runs) < 2:
             return []
         
-        all_changes = []
+        logger.info(f"🔍 Сканируем {len(runs)} ранов на изменения >= {threshold_percent}%...")
         
-        logger.info(f"🔍 Сканируем {len(run_times)} ранов на изменения >= {threshold_percent}%...")
+        # Матрица ран × отель с последней ценой отеля в ране: все пары соседних ранов сравниваем разом
+        run_prices = (df_sorted.groupby(['run_id', 'hotel_name'], observed=True)['price'].last()
+                      .unstack().reindex(range(len(runs))))
+        prices = run_prices.to_numpy(dtype='float64')
+        prev_prices, curr_prices = prices[:-1], prices[1:]
+        price_changes = curr_prices - prev_prices
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_changes_pct = np.where(prev_prices > 0, price_changes / prev_prices * 100, 0.0)
+        # Только отели, которые есть в обоих ранах
+        pair_idx, hotel_idx = np.nonzero(~np.isnan(prev_prices) & ~np.isnan(curr_prices)
+                                         & (np.abs(price_changes_pct) >= threshold_percent))
         
-        # Сравниваем каждый ран с предыдущим
-        for i in range(1, len(run_times)):
-            prev_run = run_times[i-1]
-            curr_run = run_times[i]
-            
-            changes = self.find_price_changes_between_runs(prev_run, curr_run, threshold_percent)
-            all_changes.extend(changes)
-            
-            if changes:
-                logger.info(f"  📊 Ран {curr_run}: найдено {len(changes)} изменений")
+        all_changes = []
+        hotel_names = run_prices.columns.tolist()
+        # strftime — по одному разу на ран с изменениями, а не на каждый алерт
+        run_labels = {i: runs[i + 1][0].strftime('%Y-%m-%d_%H-%M') for i in np.unique(pair_idx).tolist()}
+        for i, j in zip(pair_idx.tolist(), hotel_idx.tolist()):
+            curr_run = runs[i + 1][0]
+            hotel_name = hotel_names[j]
+            price_change = float(price_changes[i, j])
+            price_change_pct = float(price_changes_pct[i, j])
+            all_changes.append({
+                'hotel_name': hotel_name,
+                'old_price': float(prev_prices[i, j]),
+                'new_price': float(curr_prices[i, j]),
+                'price_change': price_change,
+                'price_change_pct': price_change_pct,
+                'timestamp': curr_run,
+                'alert_type': 'price_drop' if price_change < 0 else 'price_increase',
+                'created_at': created_at,
+                'threshold_percent': threshold_percent,
+                'unique_key': f"{hotel_name}_{run_labels[i]}_{price_change_pct:+.1f}"
+            })
+        
+        for i, count in enumerate(np.bincount(pair_idx, minlength=len(runs) - 1).tolist()):
+            if count:
+                logger.info(f"  📊 Ран {runs[i + 1][0]}: найдено {count} изменений")
         
         logger.info(f"✅ Всего найдено изменений: {len(all_changes)}")
         return all_changes
     
+    def _known_keys(self) -> Set[str]:
+        """unique_key уже сохраненных алертов (файл читается только при первом обращении)"""
+        if self._existing_keys is None:
+            if self._jsonl and os.path.exists(self.alerts_file):
+                # JSON Lines читаем потоково: в памяти остаются только ключи, а не вся история
+                try:
+                    self._existing_keys = {alert.get('unique_key') for alert in _iter_json_lines(self.alerts_file)
+                                           if isinstance(alert, dict) and alert.get('unique_key')}
+                except Exception as e:
+                    logger.error(f"Ошибка загрузки алертов: {e}")
+                    self._existing_keys = set()
+            else:
+                self._existing_keys = {alert.get('unique_key') for alert in self.load_alerts() if alert.get('unique_key')}
+        return self._existing_keys
+    
     def get_existing_alert_keys(self) -> Set[str]:
         """Получает ключи существующих алертов"""
-        existing_alerts = self.load_alerts()
-        return {alert.get('unique_key') for alert in existing_alerts if alert.get('unique_key')}
+        return set(self._known_keys())
     
     def get_new_alerts(self, all_changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Возвращает только новые алерты (которых нет в существующих)"""
-        existing_keys = self.get_existing_alert_keys()
+        existing_keys = self._known_keys()
         new_alerts = [alert for alert in all_changes if alert.get('unique_key') not in existing_keys]
         
         logger.info(f"📋 Существующих алертов: {len(existing_keys)}")
@@ -200,8 +420,9 @@ class PriceAlertManagerV2:
             logger.warning("Нет данных для обработки")
             return []
         
-        # Сканируем все раны на изменения
-        all_changes = self.scan_all_runs_for_changes(threshold_percent)
+        # Сканируем все раны на изменения; время создания одно на все алерты этого запуска
+        created_at = datetime.now(timezone.utc).isoformat()
+        all_changes = self.scan_all_runs_for_changes(threshold_percent, created_at=created_at)
         
         if not all_changes:
             logger.info("Изменений не найдено")
@@ -211,14 +432,8 @@ class PriceAlertManagerV2:
         new_alerts = self.get_new_alerts(all_changes)
         
         if new_alerts:
-            # Загружаем существующие алерты
-            existing_alerts = self.load_alerts()
-            
             # Добавляем новые к существующим
-            updated_alerts = existing_alerts + new_alerts
-            
-            # Сохраняем обновленный список
-            self.save_alerts(updated_alerts)
+            self.append_alerts(new_alerts)
             
             logger.info(f"💾 Сохранено {len(new_alerts)} новых алертов")
         
@@ -248,12 +463,12 @@ class PriceAlertManagerV2:
         
         if price_drops:
             report.append("📉 СНИЖЕНИЯ ЦЕН:")
-            for change in sorted(price_drops, key=lambda x: x['price_change'])[:10]:
+            for change in heapq.nsmallest(10, price_drops, key=itemgetter('price_change')):
                 report.append(f"  {change['hotel_name']}: {change['old_price']} → {change['new_price']} PLN ({change['price_change_pct']:+.1f}%)")
         
         if price_increases:
             report.append("\\n📈 ПОВЫШЕНИЯ ЦЕН:")
-            for change in sorted(price_increases, key=lambda x: x['price_change'], reverse=True)[:10]:
+            for change in heapq.nlargest(10, price_increases, key=itemgetter('price_change')):
                 report.append(f"  {change['hotel_name']}: {change['old_price']} → {change['new_price']} PLN ({change['price_change_pct']:+.1f}%)")
         
         return "\\n".join(report)
@@ -267,7 +482,7 @@ def main():
         sys.exit(1)
     
     data_file = sys.argv[1]
-    alerts_file = sys.argv[2] if len(sys.argv) > 2 else data_file.replace('.csv', '_alerts.json')
+    alerts_file = sys.argv[2] if len(sys.argv) > 2 else data_file.replace('.csv', '_alerts.jsonl')
     
     print(f"🧪 Тестируем новую логику алертов:")
     print(f"📁 Данные: {data_file}")
@@ -4,13 +4,13 @@
 """
 
 import asyncio
-import json
 import os
 import sys
 from datetime import datetime
 from typing import List, Dict, Any
 import logging
 from travel_monitor_with_airport_comparison import TravelMonitorWithAirportComparison
+from price_alerts import dump_json
 
 # Настройка логирования
 logging.basicConfig(
@@ -43,47 +43,54 @@ class AllCountriesMonitor:
             }
         ]
     
+    async def _run_one(self, country: Dict[str, str]):
+        """Мониторинг одной страны; возвращает (название страны, результат)"""
+        logger.info(f"\n{'='*60}")
+        logger.info(f"🏖️  Обрабатываем: {country['name']}")
+        logger.info(f"{'='*60}")
+        
+        # Проверяем существование файлов конфигурации
+        if not os.path.exists(country['base_config']):
+            logger.error(f"❌ Файл конфигурации не найден: {country['base_config']}")
+            return country['name'], {'status': 'error', 'message': f'Config file not found: {country["base_config"]}'}
+        
+        if not os.path.exists(country['any_airports_config']):
+            logger.error(f"❌ Файл конфигурации не найден: {country['any_airports_config']}")
+            return country['name'], {'status': 'error', 'message': f'Config file not found: {country["any_airports_config"]}'}
+        
+        # Запускаем мониторинг для страны
+        monitor = TravelMonitorWithAirportComparison(
+            country['base_config'],
+            country['any_airports_config']
+        )
+        
+        success = await monitor.run_monitoring_with_comparison()
+        
+        if success:
+            logger.info(f"✅ {country['name']}: Мониторинг завершен успешно!")
+            return country['name'], {'status': 'success', 'message': 'Monitoring completed successfully'}
+        logger.error(f"❌ {country['name']}: Ошибка при мониторинге")
+        return country['name'], {'status': 'error', 'message': 'Monitoring failed'}
+    
     async def run_all_countries(self):
-        """Запускает мониторинг для всех стран"""
+        """Запускает мониторинг для всех стран одновременно.
+
+        Страны не зависят друг от друга, а мониторинг почти все время ждет сеть,
+        поэтому общее время — как у самой долгой страны, а не сумма.
+        """
         logger.info("🌍 Начинаем мониторинг всех стран с сравнением аэропортов...")
         
-        results = {}
+        outcomes = await asyncio.gather(*(self._run_one(country) for country in self.countries),
+                                        return_exceptions=True)
         
-        for country in self.countries:
-            logger.info(f"\n{'='*60}")
-            logger.info(f"🏖️  Обрабатываем: {country['name']}")
-            logger.info(f"{'='*60}")
-            
-            try:
-                # Проверяем существование файлов конфигурации
-                if not os.path.exists(country['base_config']):
-                    logger.error(f"❌ Файл конфигурации не найден: {country['base_config']}")
-                    results[country['name']] = {'status': 'error', 'message': f'Config file not found: {country["base_config"]}'}
-                    continue
-                
-                if not os.path.exists(country['any_airports_config']):
-                    logger.error(f"❌ Файл конфигурации не найден: {country['any_airports_config']}")
-                    results[country['name']] = {'status': 'error', 'message': f'Config file not found: {country["any_airports_config"]}'}
-                    continue
-                
-                # Запускаем мониторинг для страны
-                monitor = TravelMonitorWithAirportComparison(
-                    country['base_config'],
-                    country['any_airports_config']
-                )
-                
-                success = await monitor.run_monitoring_with_comparison()
-                
-                if success:
-                    logger.info(f"✅ {country['name']}: Мониторинг завершен успешно!")
-                    results[country['name']] = {'status': 'success', 'message': 'Monitoring completed successfully'}
-                else:
-                    logger.error(f"❌ {country['name']}: Ошибка при мониторинге")
-                    results[country['name']] = {'status': 'error', 'message': 'Monitoring failed'}
-                    
-            except Exception as e:
-                logger.error(f"❌ {country['name']}: Критическая ошибка: {e}")
-                results[country['name']] = {'status': 'error', 'message': str(e)}
+        results = {}
+        for country, outcome in zip(self.countries, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"❌ {country['name']}: Критическая ошибка: {outcome}")
+                results[country['name']] = {'status': 'error', 'message': str(outcome)}
+            else:
+                name, result = outcome
+                results[name] = result
         
         # Создаем сводный отчет
         self.create_summary_report(results)
@@ -118,8 +125,7 @@ class AllCountriesMonitor:
         }
         
         try:
-            with open('data/all_countries_monitoring_summary.json', 'w', encoding='utf-8') as f:
-                json.dump(summary, f, ensure_ascii=False, indent=2)
+            dump_json('data/all_countries_monitoring_summary.json', summary)
             logger.info(f"📁 Сводный отчет сохранен в data/all_countries_monitoring_summary.json")
         except Exception as e:
             logger.error(f"❌ Ошибка сохранения сводного отчета: {e}")
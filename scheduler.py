@@ -3,34 +3,101 @@
 Планировщик для автоматического запуска мониторинга по расписанию
 """
 
-import schedule
+import sched
 import time
-import subprocess
+import asyncio
+import atexit
 import logging
+import logging.handlers
+import queue
 import csv
-from datetime import datetime
+import heapq
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import os
+import random
 import json
 
-# Настройка логирования
+try:
+    import orjson  # необязательная зависимость: быстрее читает и пишет конфигурацию
+except ImportError:
+    orjson = None
+
+# Настройка логирования: записи уходят в очередь, а на диск и в консоль их пишет фоновый поток,
+# чтобы запись лога не задерживала планировщик
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+_log_queue = queue.Queue(-1)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('scheduler.log'),
-        logging.StreamHandler()
-    ]
+    format=LOG_FORMAT,
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
+)
+# QueueHandler уже форматирует запись, поэтому обработчикам слушателя формат не нужен
+_log_listener = logging.handlers.QueueListener(
+    _log_queue,
+    logging.FileHandler('scheduler.log'),
+    logging.StreamHandler()
 )
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
+# Таймаут одного запуска мониторинга, секунды
+MONITORING_TIMEOUT = 300
+# Лог travel_monitor.py и сколько байт с его конца прикладывать к сообщению об ошибке
+MONITOR_LOG_FILE = 'monitor.log'
+MONITOR_LOG_TAIL_BYTES = 4 * 1024
+# Лимит длины сообщения Telegram и разделитель уведомлений в одной пачке
+TELEGRAM_MAX_MESSAGE = 4096
+TELEGRAM_SEPARATOR = "\n\n"
+# CSV с историей цен, который проверяет и очищает планировщик
+PRICE_DATA_FILE = "data/travel_prices.csv"
+# Сколько байт с конца CSV читать для проверки изменений цен (окно расширяется при необходимости)
+TAIL_READ_BYTES = 256 * 1024
+# Колонки CSV, нужные для проверки изменений цен
+PRICE_CHANGE_COLUMNS = ['hotel_name', 'price', 'scraped_at']
+# Максимальный сон планировщика между проверками: страхует от перевода часов и сна системы
+MAX_IDLE_SLEEP = 15 * 60
+# Сколько байт перед смещением прошлого чтения сверять, чтобы заметить перезапись CSV
+TAIL_CHECK_BYTES = 256
+
+def _idle_sleep(seconds):
+    """Сон планировщика до ближайшей задачи, но не дольше MAX_IDLE_SLEEP"""
+    time.sleep(min(seconds, MAX_IDLE_SLEEP))
+
+
+def _next_daily_run(at_time):
+    """Ближайший момент (time.time()) наступления локального времени HH:MM[:SS]"""
+    hour, minute, second = (list(map(int, at_time.split(':'))) + [0])[:3]
+    now = datetime.now()
+    run_at = now.replace(hour=hour, minute=minute, second=second, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return run_at.timestamp()
+
+
 class ScheduledMonitor:
     def __init__(self, config_file="scheduler_config.json"):
         self.config_file = config_file
         self.config = self.load_config()
+        # mtime файла конфигурации: при его изменении конфигурация перечитывается перед запуском задачи
+        self._config_mtime = self._get_config_mtime()
+        # Состояние check_price_changes между тиками: ключ файла (путь, mtime, размер), смещение
+        # прочитанного и последние строки отелей
+        self._price_cache = None
+        # Уведомления за тик копятся и уходят в Telegram пачкой через одну HTTP-сессию
+        self._tg_buffer = []
+        self._tg_session = None
+        # Очередь запусков (куча по времени); сон между задачами ограничен MAX_IDLE_SLEEP
+        self._scheduler = sched.scheduler(time.time, _idle_sleep)
+        # Мониторинг выполняется в одном рабочем потоке; _running — Future текущего запуска
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self._running = None
         
-    def load_config(self):
-        """Загружает конфигурацию расписания"""
-        default_config = {
+    def _default_config(self):
+        """Конфигурация расписания по умолчанию"""
+        return {
             "enabled": True,
             "intervals": {
                 "daily": "09:00",
@@ -42,93 +109,170 @@ class ScheduledMonitor:
                 "telegram_bot_token": "",
                 "telegram_chat_id": ""
             },
+            "jitter_seconds": 300,
             "data_retention_days": 30,
             "min_price_change_threshold": 100
         }
+    
+    def _read_config(self):
+        """Разбирает файл конфигурации и дополняет его значениями по умолчанию (ошибки не перехватывает)"""
+        if orjson is not None:
+            with open(self.config_file, 'rb') as f:
+                config = orjson.loads(f.read())
+        else:
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        return {**self._default_config(), **config}
+    
+    def load_config(self):
+        """Загружает конфигурацию расписания"""
+        default_config = self._default_config()
         
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
+                config = self._read_config()
                 logger.info(f"Конфигурация расписания загружена из {self.config_file}")
-                return {**default_config, **config}
+                return config
             except Exception as e:
+                # Файл не перезаписываем: в нем токен и настройки пользователя, ошибку можно исправить
                 logger.warning(f"Ошибка загрузки конфигурации: {e}. Используется дефолтная конфигурация.")
+                return default_config
         
         # Создаем дефолтную конфигурацию
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(default_config, f, indent=2, ensure_ascii=False)
+        if orjson is not None:
+            with open(self.config_file, 'wb') as f:
+                f.write(orjson.dumps(default_config, option=orjson.OPT_INDENT_2))
+        else:
+            with open(self.config_file, 'w', encoding='utf-8') as f:
+                json.dump(default_config, f, indent=2, ensure_ascii=False)
         logger.info(f"Создана дефолтная конфигурация в {self.config_file}")
         return default_config
     
+    def _get_config_mtime(self):
+        """mtime файла конфигурации (None, если файла нет)"""
+        try:
+            return os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _reload_config_if_changed(self):
+        """Перечитывает конфигурацию, если файл изменился (один stat вместо разбора JSON).
+
+        Если файл не разбирается (сохранен не до конца, опечатка) или удален, остается текущая
+        конфигурация, а файл не трогается; попытка повторится при следующем запуске задачи.
+        """
+        mtime = self._get_config_mtime()
+        if mtime == self._config_mtime:
+            return False
+        try:
+            config = self._read_config()
+        except Exception as e:
+            logger.warning(f"Не удалось перечитать {self.config_file}: {e}. Продолжаем с текущей конфигурацией")
+            return False
+        self.config = config
+        self._config_mtime = mtime
+        logger.info(f"Конфигурация расписания перечитана из {self.config_file}")
+        return True
+    
     def run_monitoring(self):
         """Запускает мониторинг"""
         try:
             logger.info("🚀 Запуск мониторинга по расписанию...")
             
-            # Запускаем основной скрипт
-            result = subprocess.run(['python', 'travel_monitor.py'], 
-                                  capture_output=True, text=True, timeout=300)
+            # Запускаем мониторинг в этом же процессе: без старта интерпретатора и повторного
+            # импорта pandas/playwright на каждом тике (модуль импортируется один раз)
+            from travel_monitor import TravelPriceMonitor
+            
+            # basicConfig в travel_monitor здесь ничего не делает (логирование уже настроено),
+            # поэтому monitor.log на время запуска подключаем сами
+            monitor_log = logging.FileHandler(MONITOR_LOG_FILE, encoding='utf-8')
+            monitor_log.setFormatter(logging.Formatter(LOG_FORMAT))
+            logging.getLogger().addHandler(monitor_log)
+            try:
+                monitor = TravelPriceMonitor()
+                success = asyncio.run(asyncio.wait_for(monitor.run_monitoring(), timeout=MONITORING_TIMEOUT))
+            finally:
+                logging.getLogger().removeHandler(monitor_log)
+                monitor_log.close()
             
-            if result.returncode == 0:
-                logger.info("✅ Мониторинг выполнен успешно")
+            if success:
+                if monitor.failed_urls:
+                    # Часть поисков не собрана: данные сохранены только по остальным
+                    status = f"Мониторинг цен завершен частично, не собраны URL: {', '.join(monitor.failed_urls)}"
+                    logger.warning(f"⚠️ {status}")
+                else:
+                    status = "Мониторинг цен завершен успешно"
+                    logger.info("✅ Мониторинг выполнен успешно")
                 
                 # Проверяем изменения цен
                 self.check_price_changes()
                 
+                # Удаляем историю старше data_retention_days
+                self.prune_history()
+                
                 # Отправляем уведомления если настроено
                 if self.config['notifications']['enabled']:
-                    self.send_notification("Мониторинг цен завершен успешно")
+                    self.send_notification(status)
                     
             else:
-                logger.error(f"❌ Ошибка выполнения мониторинга: {result.stderr}")
+                # Вывод мониторинга не копится в памяти: для отчета берем только хвост monitor.log
+                log_tail = self._read_log_tail(MONITOR_LOG_FILE)
+                logger.error(f"❌ Ошибка выполнения мониторинга: {log_tail}")
                 if self.config['notifications']['enabled']:
-                    self.send_notification(f"Ошибка мониторинга: {result.stderr}")
+                    self.send_notification(f"Ошибка мониторинга: {log_tail}")
                     
-        except subprocess.TimeoutExpired:
+        except asyncio.TimeoutError:
             logger.error("❌ Таймаут выполнения мониторинга")
+        except SystemExit:
+            # TravelPriceMonitor завершает процесс при ошибке загрузки конфигурации
+            logger.error("❌ Мониторинг не запущен: ошибка загрузки конфигурации")
         except Exception as e:
             logger.error(f"❌ Неожиданная ошибка: {e}")
+        finally:
+            self.flush_notifications()
+    
+    def _read_log_tail(self, log_file, tail_bytes=MONITOR_LOG_TAIL_BYTES):
+        """Возвращает последние строки лога (не больше tail_bytes байт)"""
+        try:
+            with open(log_file, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                f.seek(max(0, size - tail_bytes))
+                data = f.read()
+        except OSError as e:
+            return f"лог {log_file} недоступен: {e}"
+        if size > tail_bytes:
+            # Первая строка окна обрезана — отбрасываем ее
+            data = data.partition(b'\n')[2]
+        return data.decode('utf-8', errors='replace').strip()
     
     def check_price_changes(self):
-        """Проверяет значительные изменения цен"""
+        """Проверяет значительные изменения цен.
+
+        Между тиками кэшируется последняя строка каждого отеля: если CSV только дописан,
+        разбираются лишь новые байты после прошлого чтения, а если не менялся — проверка пропускается.
+        """
         try:
-            import pandas as pd
-            
-            data_file = "data/travel_prices.csv"
+            data_file = PRICE_DATA_FILE
             if not os.path.exists(data_file):
                 return
             
-            df = pd.read_csv(data_file, quoting=csv.QUOTE_ALL)
-            df['scraped_at'] = pd.to_datetime(df['scraped_at'])
-            
-            # Получаем последние данные
-            latest_data = df[df['scraped_at'] == df['scraped_at'].max()]
-            previous_data = df[df['scraped_at'] < df['scraped_at'].max()]
-            
-            if previous_data.empty:
+            stat = os.stat(data_file)
+            key = (data_file, stat.st_mtime_ns, stat.st_size)
+            cache = self._price_cache
+            if cache is not None and cache['key'] == key:
+                # Файл не менялся с прошлой проверки (мониторинг ничего не дописал) — об этих
+                # изменениях уже сообщили
+                logger.info("Данные не изменились с прошлой проверки цен")
                 return
-            
-            # Находим значительные изменения цен
-            significant_changes = []
-            threshold = self.config['min_price_change_threshold']
-            
-            for hotel in latest_data['hotel_name'].unique():
-                latest_price = latest_data[latest_data['hotel_name'] == hotel]['price'].iloc[0]
-                previous_prices = previous_data[previous_data['hotel_name'] == hotel]['price']
-                
-                if not previous_prices.empty:
-                    previous_price = previous_prices.iloc[-1]
-                    change = latest_price - previous_price
-                    
-                    if abs(change) >= threshold:
-                        significant_changes.append({
-                            'hotel': hotel,
-                            'previous_price': previous_price,
-                            'current_price': latest_price,
-                            'change': change,
-                            'change_pct': (change / previous_price) * 100
-                        })
+            result = self._check_new_rows(data_file, cache) if cache is not None else None
+            if result is None:
+                result = self._check_tail(data_file)
+            if result is None:
+                return
+            significant_changes, last_rows, max_ts, offset, tail = result
+            self._price_cache = {'key': key, 'file': data_file, 'offset': offset, 'tail': tail,
+                                 'last_rows': last_rows, 'max_ts': max_ts}
             
             if significant_changes:
                 self.report_price_changes(significant_changes)
@@ -136,15 +280,182 @@ class ScheduledMonitor:
         except Exception as e:
             logger.warning(f"Ошибка проверки изменений цен: {e}")
     
+    def prune_history(self):
+        """Удаляет из CSV строки старше data_retention_days (0 или пусто — хранить все).
+
+        Даты сравниваются по префиксу ISO-строки (YYYY-MM-DDTHH:MM:SS) без учета часового пояса —
+        для окна в несколько дней это несущественно. Строки без даты сохраняются.
+        """
+        retention_days = self.config['data_retention_days']
+        data_file = PRICE_DATA_FILE
+        if not retention_days or not os.path.exists(data_file):
+            return
+        
+        try:
+            cutoff = (datetime.now() - timedelta(days=retention_days)).strftime('%Y-%m-%dT%H:%M:%S')
+            old_size = os.path.getsize(data_file)
+            tmp_file = data_file + '.tmp'
+            removed = 0
+            with open(data_file, 'r', newline='', encoding='utf-8') as src, \
+                    open(tmp_file, 'w', newline='', encoding='utf-8') as dst:
+                reader = csv.reader(src)
+                writer = csv.writer(dst, quoting=csv.QUOTE_ALL)
+                header = next(reader, None)
+                if header is not None and 'scraped_at' in header:
+                    writer.writerow(header)
+                    date_col = header.index('scraped_at')
+                    for row in reader:
+                        scraped_at = row[date_col][:19] if len(row) > date_col else ''
+                        if scraped_at and scraped_at < cutoff:
+                            removed += 1
+                            continue
+                        writer.writerow(row)
+            
+            if not removed:
+                os.remove(tmp_file)
+                return
+            os.replace(tmp_file, data_file)
+            logger.info(f"🧹 Удалено {removed} записей старше {retention_days} дней из {data_file}")
+            
+            # Кэш check_price_changes указывает смещения в старом файле: если он был дочитан до конца,
+            # переносим его на конец нового файла, иначе сбрасываем
+            cache = self._price_cache
+            if cache is not None and cache['file'] == data_file:
+                if cache['offset'] == old_size:
+                    stat = os.stat(data_file)
+                    with open(data_file, 'rb') as f:
+                        f.seek(max(0, stat.st_size - TAIL_CHECK_BYTES))
+                        tail = f.read()
+                    cache.update(key=(data_file, stat.st_mtime_ns, stat.st_size), offset=stat.st_size, tail=tail)
+                else:
+                    self._price_cache = None
+                    
+        except Exception as e:
+            logger.warning(f"Ошибка очистки истории цен: {e}")
+    
+    def _check_tail(self, data_file):
+        """Изменения цен по хвосту CSV; None, если сравнивать не с чем"""
+        # Читаем только хвост файла; окно растет, пока в нем не найдется предыдущая цена
+        # каждого отеля из последнего снимка (или пока не прочитан весь файл)
+        tail_bytes = TAIL_READ_BYTES
+        while True:
+            df, whole_file, offset, tail = self._read_csv_tail(data_file, tail_bytes)
+            
+            # Получаем последние данные
+            max_ts = df['scraped_at'].max()
+            latest_data = df[df['scraped_at'] == max_ts]
+            previous_data = df[df['scraped_at'] < max_ts]
+            
+            if whole_file or (not latest_data.empty
+                              and set(latest_data['hotel_name']).issubset(previous_data['hotel_name'])):
+                break
+            tail_bytes *= 4
+        
+        if previous_data.empty:
+            return None
+        last_rows = df.drop_duplicates('hotel_name', keep='last')
+        return self._find_changes(latest_data, previous_data), last_rows, max_ts, offset, tail
+    
+    def _check_new_rows(self, data_file, cache):
+        """Изменения цен по строкам, дописанным после прошлой проверки.
+
+        Предыдущие цены берутся из кэша последних строк отелей. None — если файл перезаписан
+        (не совпадает конец прочитанной части), новых строк нет или кэша не хватает.
+        """
+        import pandas as pd
+        
+        offset, tail = cache['offset'], cache['tail']
+        if cache['file'] != data_file or os.path.getsize(data_file) <= offset:
+            return None
+        with open(data_file, 'rb') as f:
+            f.seek(offset - len(tail))
+            if f.read(len(tail)) != tail:
+                return None
+            new_bytes = f.read()
+        new_rows = self._parse_csv_rows(data_file, new_bytes)
+        if new_rows.empty:
+            return None
+        
+        max_ts = new_rows['scraped_at'].max()
+        if not max_ts > cache['max_ts']:
+            return None
+        latest_data = new_rows[new_rows['scraped_at'] == max_ts]
+        # Все строки из кэша старше нового снимка; новые строки идут в файле после них.
+        # Пустые части в concat не передаем: от них зависел бы тип колонок результата
+        previous_parts = [rows for rows in (cache['last_rows'], new_rows[new_rows['scraped_at'] < max_ts]) if not rows.empty]
+        if not previous_parts:
+            return None
+        previous_data = pd.concat(previous_parts, ignore_index=True)
+        if not set(latest_data['hotel_name']).issubset(previous_data['hotel_name']):
+            # Предыдущая цена какого-то отеля лежит за пределами кэша — читаем хвост заново
+            return None
+        
+        last_rows = pd.concat([rows for rows in (cache['last_rows'], new_rows) if not rows.empty],
+                              ignore_index=True).drop_duplicates('hotel_name', keep='last')
+        offset += len(new_bytes)
+        tail = (tail + new_bytes)[-TAIL_CHECK_BYTES:]
+        return self._find_changes(latest_data, previous_data), last_rows, max_ts, offset, tail
+    
+    def _find_changes(self, latest_data, previous_data):
+        """Значительные изменения: первая цена отеля в последнем снимке против его последней цены до него"""
+        import pandas as pd
+        
+        # Одним выравниванием по названию отеля вместо фильтрации по каждому отелю
+        threshold = self.config['min_price_change_threshold']
+        latest_prices = latest_data.drop_duplicates('hotel_name').set_index('hotel_name')['price']
+        previous_prices = (previous_data.drop_duplicates('hotel_name', keep='last')
+                           .set_index('hotel_name')['price'].reindex(latest_prices.index))
+        changes = pd.DataFrame({
+            'hotel': latest_prices.index,
+            'previous_price': previous_prices.to_numpy(),
+            'current_price': latest_prices.to_numpy(),
+        })
+        changes['change'] = changes['current_price'] - changes['previous_price']
+        changes['change_pct'] = changes['change'] / changes['previous_price'] * 100
+        return changes[changes['change'].abs() >= threshold].to_dict('records')
+    
+    def _read_csv_tail(self, data_file, tail_bytes):
+        """Читает последние tail_bytes байт CSV (с первой целой строки).
+
+        Возвращает (DataFrame, прочитан ли весь файл, смещение конца прочитанного,
+        последние TAIL_CHECK_BYTES байт прочитанного — для проверки при следующем чтении).
+        """
+        size = os.path.getsize(data_file)
+        with open(data_file, 'rb') as f:
+            f.seek(max(0, size - tail_bytes))
+            whole_file = f.tell() == 0
+            data = f.read()
+            offset = f.tell()
+        # Первая строка окна — заголовок или обрезанная запись: пропускаем ее
+        df = self._parse_csv_rows(data_file, data[data.find(b'\n') + 1:])
+        return df, whole_file, offset, data[-TAIL_CHECK_BYTES:]
+    
+    def _parse_csv_rows(self, data_file, data):
+        """Разбирает строки CSV без заголовка (имена колонок — из заголовка файла, читается один раз)"""
+        import pandas as pd
+        
+        if getattr(self, '_csv_header', None) is None or self._csv_header[0] != data_file:
+            with open(data_file, 'r', encoding='utf-8', newline='') as f:
+                self._csv_header = (data_file, next(csv.reader(f)))
+        # Разбираем только нужные колонки; названия отелей повторяются — храним их как category
+        df = pd.read_csv(io.BytesIO(data), header=None, names=self._csv_header[1], usecols=PRICE_CHANGE_COLUMNS,
+                         dtype={'hotel_name': 'category'}, quoting=csv.QUOTE_ALL, on_bad_lines='skip')
+        # format='ISO8601' + utc: в файле встречаются даты и с часовым поясом, и без него
+        df['scraped_at'] = pd.to_datetime(df['scraped_at'], utc=True, format='ISO8601')
+        return df
+    
     def report_price_changes(self, changes):
         """Отправляет отчет об изменениях цен"""
-        message = "📊 ЗНАЧИТЕЛЬНЫЕ ИЗМЕНЕНИЯ ЦЕН:\n\n"
+        lines = ["📊 ЗНАЧИТЕЛЬНЫЕ ИЗМЕНЕНИЯ ЦЕН:\n\n"]
         
-        for change in changes[:10]:  # Топ-10 изменений
+        # Топ-10 изменений по модулю процента (без полной сортировки списка)
+        top_changes = heapq.nlargest(10, changes, key=lambda change: abs(change['change_pct']))
+        for change in top_changes:
             direction = "📈" if change['change'] > 0 else "📉"
-            message += f"{direction} {change['hotel'][:40]}\n"
-            message += f"   {change['previous_price']:.0f} PLN → {change['current_price']:.0f} PLN "
-            message += f"({change['change']:+.0f} PLN, {change['change_pct']:+.1f}%)\n\n"
+            lines.append(f"{direction} {change['hotel'][:40]}\n"
+                         f"   {change['previous_price']:.0f} PLN → {change['current_price']:.0f} PLN "
+                         f"({change['change']:+.0f} PLN, {change['change_pct']:+.1f}%)\n\n")
+        message = "".join(lines)
         
         logger.info(f"Найдено {len(changes)} значительных изменений цен")
         
@@ -152,11 +463,24 @@ class ScheduledMonitor:
             self.send_notification(message)
     
     def send_notification(self, message):
-        """Отправляет уведомление"""
+        """Ставит уведомление в очередь; отправка — в flush_notifications"""
+        # Telegram уведомления
+        if self.config['notifications']['telegram_bot_token']:
+            self._tg_buffer.append(message)
+    
+    def flush_notifications(self):
+        """Отправляет накопленные уведомления: склеивает их в сообщения до лимита Telegram"""
+        messages, self._tg_buffer = self._tg_buffer, []
         try:
-            # Telegram уведомления
-            if self.config['notifications']['telegram_bot_token']:
-                self.send_telegram_message(message)
+            batch = ""
+            for message in messages:
+                message = message[:TELEGRAM_MAX_MESSAGE]
+                if batch and len(batch) + len(TELEGRAM_SEPARATOR) + len(message) > TELEGRAM_MAX_MESSAGE:
+                    self.send_telegram_message(batch)
+                    batch = ""
+                batch = f"{batch}{TELEGRAM_SEPARATOR}{message}" if batch else message
+            if batch:
+                self.send_telegram_message(batch)
                 
         except Exception as e:
             logger.warning(f"Ошибка отправки уведомления: {e}")
@@ -164,7 +488,10 @@ class ScheduledMonitor:
     def send_telegram_message(self, message):
         """Отправляет сообщение в Telegram"""
         try:
-            import requests
+            if self._tg_session is None:
+                import requests
+                # Keep-alive: одно TLS-соединение на все сообщения
+                self._tg_session = requests.Session()
             
             bot_token = self.config['notifications']['telegram_bot_token']
             chat_id = self.config['notifications']['telegram_chat_id']
@@ -176,7 +503,7 @@ class ScheduledMonitor:
                 'parse_mode': 'HTML'
             }
             
-            response = requests.post(url, data=data, timeout=10)
+            response = self._tg_session.post(url, data=data, timeout=10)
             if response.status_code == 200:
                 logger.info("✅ Telegram уведомление отправлено")
             else:
@@ -193,20 +520,59 @@ class ScheduledMonitor:
         
         # Ежедневный запуск
         if self.config['intervals']['daily']:
-            schedule.every().day.at(self.config['intervals']['daily']).do(self.run_monitoring)
+            self._schedule_daily(self.config['intervals']['daily'])
             logger.info(f"Настроен ежедневный запуск в {self.config['intervals']['daily']}")
         
         # Почасовой запуск
         if self.config['intervals']['hourly']:
-            schedule.every().hour.do(self.run_monitoring)
+            self._schedule_hourly()
             logger.info("Настроен почасовой запуск")
         
         # Пользовательские часы
         if self.config['intervals']['custom_hours']:
             for hour in self.config['intervals']['custom_hours']:
-                schedule.every().day.at(f"{hour:02d}:00").do(self.run_monitoring)
+                self._schedule_daily(f"{hour:02d}:00")
             logger.info(f"Настроен запуск в часы: {self.config['intervals']['custom_hours']}")
     
+    def _schedule_daily(self, at_time):
+        """Ставит запуск на ближайшее локальное время HH:MM[:SS]; после запуска — на следующий день"""
+        self._scheduler.enterabs(_next_daily_run(at_time) + self._jitter(), 0,
+                                 self._run_scheduled, (lambda: self._schedule_daily(at_time),))
+    
+    def _schedule_hourly(self):
+        """Ставит запуск через час; после запуска — еще через час"""
+        self._scheduler.enter(60 * 60 + self._jitter(), 0, self._run_scheduled, (self._schedule_hourly,))
+    
+    def _run_scheduled(self, reschedule):
+        """Запускает задачу расписания и ставит ее следующий запуск.
+
+        Если файл конфигурации изменился, она перечитывается, а расписание строится заново.
+        """
+        if self._reload_config_if_changed():
+            for event in self._scheduler.queue:
+                self._scheduler.cancel(event)
+            logger.info("Конфигурация расписания изменилась — расписание перестроено")
+            self.setup_schedule()
+            if self.config['enabled']:
+                self._dispatch_monitoring()
+            return
+        self._dispatch_monitoring()
+        reschedule()
+    
+    def _dispatch_monitoring(self):
+        """Отдает run_monitoring в рабочий поток, чтобы не задерживать планировщик.
+
+        Если предыдущий запуск еще идет, новый пропускается.
+        """
+        if self._running is not None and not self._running.done():
+            logger.warning("⏭️ Предыдущий запуск мониторинга еще не завершен — запуск пропущен")
+            return
+        self._running = self._pool.submit(self.run_monitoring)
+    
+    def _jitter(self):
+        """Случайная задержка запуска, чтобы несколько экземпляров не обращались к сайту в одну секунду"""
+        return random.uniform(0, self.config['jitter_seconds'])
+    
     def run_scheduler(self):
         """Запускает планировщик"""
         logger.info("🕐 Запуск планировщика мониторинга...")
@@ -215,11 +581,16 @@ class ScheduledMonitor:
         self.setup_schedule()
         
         try:
-            while True:
-                schedule.run_pending()
-                time.sleep(60)  # Проверяем каждую минуту
+            if self._scheduler.empty():
+                logger.info("Нет запланированных задач — планировщик завершает работу")
+                return
+            # sched держит задачи в куче и спит до ближайшей; сам мониторинг идет в рабочем потоке,
+            # поэтому его длительность не сдвигает следующие запуски
+            self._scheduler.run()
         except KeyboardInterrupt:
             logger.info("Планировщик остановлен пользователем")
+        finally:
+            self._pool.shutdown(wait=False)
 
 def main():
     monitor = ScheduledMonitor()
@@ -10,17 +10,22 @@ import asyncio
 import json
 import csv
 import os
+import re
 import sys
 from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional
 import pandas as pd
-import matplotlib.pyplot as plt
 from playwright.async_api import async_playwright
 import logging
 from price_alerts import PriceAlertManager
 from price_alerts_v2 import PriceAlertManagerV2
 from airport_comparison import AirportComparison
 
+try:
+    import orjson  # необязательная зависимость: быстрее сериализует JSON-состояние
+except ImportError:
+    orjson = None
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO, 
@@ -32,12 +37,202 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def _dump_json_compact(path: str, data: Any):
+    """Пишет JSON-состояние без отступов (через orjson, если он установлен)"""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+
+# Колонки CSV с историей цен (в этом порядке)
+CSV_FIELDNAMES = ['hotel_name', 'price', 'dates', 'duration', 'rating', 'departure_airport', 'scraped_at', 'url', 'image_url', 'offer_url']
+
+# Селекторы контейнеров предложений в порядке приоритета
+OFFER_CONTAINER_SELECTORS = [
+    '.offer-item',
+    '.trip-item',
+    '.hotel-item',
+    '.search-result-item',
+    '[data-testid*="offer"]',
+    '.result-item',
+    '.offer',
+    '.trip',
+    '.hotel',
+    '[class*="offer"]',
+    '[class*="trip"]',
+    '[class*="hotel"]'
+]
+
+# Первый по приоритету селектор, у которого есть видимый элемент (видимость - как у Playwright:
+# ненулевой размер и не visibility:hidden)
+PICK_SELECTOR_JS = r"""
+(selectors) => {
+    const visible = (el) => {
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    };
+    for (const sel of selectors) {
+        if (Array.from(document.querySelectorAll(sel)).some(visible)) return sel;
+    }
+    return null;
+}
+"""
+
+# Цена: целая часть с разделителями тысяч (пробел, неразрывный пробел или точка перед группой
+# из трех цифр) и необязательные копейки после запятой или точки — "1 299,00 PLN", "1.299 zł".
+# extract_price округляет цену до целых PLN: хранилища и алерты рассчитаны на целые цены (float32)
+PRICE_RE = re.compile(r'(\d+(?:[\s.]\d{3})*)(?:[.,](\d{1,2})(?!\d))?')
+NON_DIGIT_RE = re.compile(r'\D')
+
+# Селекторы полей карточки предложения; внутри списка порядок задает приоритет
+OFFER_FIELD_SELECTORS = {
+    # Название отеля/тура
+    'title': [
+        'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+        '.title', '.name', '.hotel-name', '.offer-title',
+        '[class*="title"]', '[class*="name"]', '[class*="hotel"]'
+    ],
+    # Цена, если не нашлась цена за всех
+    'price': [
+        '.price', '.cost', '.amount', '.value',
+        '[class*="price"]', '[class*="cost"]', '[class*="amount"]'
+    ],
+    # Даты - более специфичные селекторы для fly.pl
+    'dates': [
+        # Основные селекторы дат
+        '.date', '.dates', '.departure-date', '.arrival-date',
+        '.travel-date', '.trip-date', '.journey-date',
+        # Селекторы с классами
+        '[class*="date"]', '[class*="departure"]', '[class*="arrival"]',
+        '[class*="travel"]', '[class*="trip"]', '[class*="journey"]',
+        # Селекторы с data-атрибутами
+        '[data-date]', '[data-departure]', '[data-arrival]',
+        # Селекторы для периодов
+        '.period', '.range', '.from-to',
+        # Селекторы для времени
+        '.time', '.when', '.schedule'
+    ],
+    # Длительность - более специфичные селекторы для fly.pl
+    'duration': [
+        # Основные селекторы длительности
+        '.duration', '.nights', '.days', '.length',
+        '.trip-duration', '.stay-duration', '.period',
+        # Селекторы с классами
+        '[class*="duration"]', '[class*="nights"]', '[class*="days"]',
+        '[class*="length"]', '[class*="period"]',
+        # Селекторы с data-атрибутами
+        '[data-duration]', '[data-nights]', '[data-days]'
+    ],
+    # Ссылки на детальную страницу, в порядке проверки в extract_offer_url
+    'links': [
+        'a.image-link',            # Основной селектор для ссылок на предложения
+        'a.offer-con',             # Альтернативный селектор
+        'a[href*="/wycieczka/"]',  # Детальные страницы предложений
+        'a[href*="offer"]',        # Ссылка содержащая "offer"
+        'a[href*="hotel"]',        # Ссылка содержащая "hotel"
+        'a[href*="trip"]',         # Ссылка содержащая "trip"
+        'a[href*="detail"]',       # Ссылка содержащая "detail"
+        'a[href*="view"]',         # Ссылка содержащая "view"
+        'a[class*="link"]',        # Ссылка с классом содержащим "link"
+        'a[href]'                  # Любая ссылка
+    ],
+    # Атрибуты <img> с URL изображения
+    'image_attrs': ['src', 'data-src', 'data-original', 'data-lazy'],
+}
+
+# Типы ресурсов, которые не загружаются при парсинге (URL картинок берется из атрибутов, а не из загрузки).
+# Стили не блокируются: от них зависит innerText (скрытые элементы) и видимость пагинации
+BLOCKED_RESOURCE_TYPES = {'image', 'font', 'media'}
+# Трекеры и реклама - по подстроке URL
+BLOCKED_URL_PARTS = (
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net',
+    'facebook.net', 'hotjar.com', 'criteo.', 'clarity.ms'
+)
+
+# Собирает сырые данные всех карточек за один вызов page.evaluate: обход DOM идет в браузере,
+# а разбор текста (даты, длительность, цена, ссылки) остается в Python
+COLLECT_OFFERS_JS = r"""
+([elements, s]) => {
+    const text = (node) => (node && node.innerText) || '';
+    const query = (root, sel) => { try { return root.querySelector(sel); } catch (e) { return null; } };
+    const queryAll = (root, sel) => { try { return Array.from(root.querySelectorAll(sel)); } catch (e) { return []; } };
+    // Текст первого элемента с непустым текстом, перебирая селекторы по приоритету
+    const firstText = (root, selectors) => {
+        for (const sel of selectors) {
+            const t = text(query(root, sel)).trim();
+            if (t) return t;
+        }
+        return '';
+    };
+    // Тексты всех подходящих элементов в порядке селекторов (без повторов)
+    const allTexts = (root, selectors) => {
+        const seen = new Set();
+        const out = [];
+        for (const sel of selectors) {
+            for (const node of queryAll(root, sel)) {
+                const t = text(node);
+                if (t && !seen.has(t)) { seen.add(t); out.push(t); }
+            }
+        }
+        return out;
+    };
+    // Цена за всех (za wszystkich), иначе блок price-view-2
+    const priceForAll = (root) => {
+        for (const node of queryAll(root, '[class*="price"]')) {
+            const t = text(node);
+            const lower = t.toLowerCase();
+            if (t && (lower.includes('za wszystkich') || lower.includes('za wszystkie'))
+                    && /[\d\s,]+/.test(t.replace(/\./g, '').replace(/,/g, '.'))) {
+                return t.trim();
+            }
+        }
+        return text(query(root, '.price-view-2, [class*="price-view-2"]')).trim();
+    };
+    return elements.map((el) => {
+        try {
+            const fullText = text(el);
+            if (fullText.trim().length < 10) return null;
+            const forAll = priceForAll(el);
+            const img = query(el, 'img');
+            const bg = query(el, '[style*="background"]');
+            const parent = el.parentElement;
+            return {
+                full_text: fullText,
+                hotel_name: firstText(el, s.title),
+                price: forAll || firstText(el, s.price),
+                date_texts: allTexts(el, s.dates),
+                duration_texts: allTexts(el, s.duration),
+                image_attrs: img ? s.image_attrs.map((a) => img.getAttribute(a)) : [],
+                background_style: bg ? bg.getAttribute('style') : null,
+                computed_background: getComputedStyle(el).backgroundImage,
+                tag: el.tagName.toLowerCase(),
+                href: el.getAttribute('href'),
+                link_hrefs: s.links.map((sel) => { const a = query(el, sel); return a ? a.getAttribute('href') : null; }),
+                parent_tag: parent ? parent.tagName.toLowerCase() : '',
+                parent_href: parent ? parent.getAttribute('href') : null,
+            };
+        } catch (e) {
+            return { error: String(e) };
+        }
+    });
+}
+"""
+
+
 class TravelPriceMonitor:
     def __init__(self, config_file: str = "config.json", data_file: Optional[str] = None):
         self.config_file = config_file
         self.config = self.load_config()
         # data_file из аргументов имеет приоритет над output_data_file из конфигурации
         self.data_file = data_file or self.config.get('output_data_file', 'travel_prices.csv')
+        # Селекторы контейнеров предложений, сработавшие в прошлых запусках, по URL (см. find_offers)
+        self._offer_selectors = None
+        # URL, с которых в последнем scrape_offers_with_retry не удалось собрать предложения
+        self.failed_urls: List[str] = []
         
     def load_config(self) -> Dict[str, Any]:
         """Загружает конфигурацию из файла"""
@@ -50,143 +245,197 @@ class TravelPriceMonitor:
             logger.error(f"Ошибка загрузки конфигурации: {e}")
             sys.exit(1)
 
+    def get_target_urls(self) -> List[str]:
+        """URL для парсинга: список config['urls'] или единственный config['url']"""
+        return self.config.get('urls') or [self.config['url']]
+
     async def scrape_offers_with_retry(self) -> List[Dict[str, Any]]:
-        """Парсит предложения с повторными попытками"""
-        for attempt in range(self.config['max_retries']):
+        """Парсит предложения со всех URL конфигурации с повторными попытками.
+
+        Браузер запускается один раз на все попытки; URL парсятся параллельно, каждый в своем
+        контексте браузера. Повторные попытки делаются только для URL, не давших результатов.
+        """
+        urls = self.get_target_urls()
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        async with async_playwright() as p:
+            browser = await self._launch_browser(p)
             try:
-                logger.info(f"Попытка {attempt + 1}/{self.config['max_retries']}")
-                offers = await self.scrape_offers()
-                if offers:
-                    return offers
-                else:
-                    logger.warning(f"Попытка {attempt + 1} не дала результатов")
-            except Exception as e:
-                logger.error(f"Ошибка в попытке {attempt + 1}: {e}")
-                if attempt < self.config['max_retries'] - 1:
-                    logger.info(f"Ждем {self.config['retry_delay']} секунд...")
-                    await asyncio.sleep(self.config['retry_delay'])
+                for attempt in range(self.config['max_retries']):
+                    try:
+                        logger.info(f"Попытка {attempt + 1}/{self.config['max_retries']}")
+                        if not browser.is_connected():
+                            # Браузер упал в прошлой попытке - перезапускаем
+                            try:
+                                await browser.close()
+                            except:
+                                pass
+                            browser = await self._launch_browser(p)
+                        pending = [url for url in urls if url not in results]
+                        scraped = await asyncio.gather(
+                            *[self.scrape_offers(browser, url) for url in pending],
+                            return_exceptions=True
+                        )
+                        for url, offers in zip(pending, scraped):
+                            if isinstance(offers, Exception):
+                                logger.error(f"Ошибка парсинга {url}: {offers}")
+                            elif offers:
+                                results[url] = offers
+                        if len(results) == len(urls):
+                            break
+                        else:
+                            logger.warning(f"Попытка {attempt + 1} не дала результатов для {len(urls) - len(results)} из {len(urls)} URL")
+                    except Exception as e:
+                        logger.error(f"Ошибка в попытке {attempt + 1}: {e}")
+                        if attempt < self.config['max_retries'] - 1:
+                            logger.info(f"Ждем {self.config['retry_delay']} секунд...")
+                            await asyncio.sleep(self.config['retry_delay'])
+            finally:
+                try:
+                    await browser.close()
+                except:
+                    pass
         
-        logger.error("Все попытки исчерпаны")
-        return []
+        self.failed_urls = [url for url in urls if url not in results]
+        if not results:
+            logger.error("Все попытки исчерпаны")
+        elif self.failed_urls:
+            logger.error(f"Все попытки исчерпаны для {len(self.failed_urls)} из {len(urls)} URL")
+        # Порядок предложений - в порядке URL конфигурации
+        return [offer for url in urls for offer in results.get(url, [])]
+
+    async def _block_heavy_resources(self, route):
+        """Обработчик page.route: обрывает запросы ресурсов, не влияющих на текст предложений"""
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or any(part in request.url for part in BLOCKED_URL_PARTS):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _launch_browser(self, p):
+        """Запускает headless Chromium"""
+        return await p.chromium.launch(
+            headless=True,
+            args=[
+                '--no-sandbox',
+                '--disable-dev-shm-usage',
+                '--disable-gpu',
+                '--disable-web-security'
+            ]
+        )
 
-    async def scrape_offers(self) -> List[Dict[str, Any]]:
-        """Парсит предложения с сайта fly.pl с пагинацией"""
+    async def scrape_offers(self, browser, url: str) -> List[Dict[str, Any]]:
+        """Парсит предложения с сайта fly.pl по url с пагинацией в новом контексте браузера"""
         all_offers = []
         page_number = 1
         max_price_threshold = 8100  # Максимальная цена для остановки
         
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--disable-web-security'
-                ]
-            )
+        context = await browser.new_context(
+            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            viewport={'width': 1920, 'height': 1080}
+        )
+        # Картинки, шрифты, медиа и трекеры не нужны для разбора текста - не загружаем их
+        await context.route("**/*", self._block_heavy_resources)
+        
+        page = await context.new_page()
+        
+        try:
+            logger.info(f"Переходим на страницу: {url}")
             
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                viewport={'width': 1920, 'height': 1080}
+            # Устанавливаем таймауты
+            page.set_default_timeout(self.config['wait_timeout'])
+            
+            # Переходим на страницу
+            response = await page.goto(
+                url, 
+                wait_until='domcontentloaded',
+                timeout=self.config['wait_timeout']
             )
             
-            page = await context.new_page()
+            if not response or response.status >= 400:
+                raise Exception(f"Ошибка загрузки: {response.status if response else 'No response'}")
             
-            try:
-                logger.info(f"Переходим на страницу: {self.config['url']}")
-                
-                # Устанавливаем таймауты
-                page.set_default_timeout(self.config['wait_timeout'])
-                
-                # Переходим на страницу
-                response = await page.goto(
-                    self.config['url'], 
-                    wait_until='domcontentloaded',
-                    timeout=self.config['wait_timeout']
-                )
+            logger.info("Страница загружена, ждем контент...")
+            await self.wait_for_offers(page)
+            
+            # Парсим страницы пока не достигнем максимальной цены
+            while page_number <= 10:  # Максимум 10 страниц для безопасности
+                logger.info(f"Парсим страницу {page_number}...")
                 
-                if not response or response.status >= 400:
-                    raise Exception(f"Ошибка загрузки: {response.status if response else 'No response'}")
+                # Ищем предложения на текущей странице
+                offers_data = await self.find_offers(page, url)
                 
-                logger.info("Страница загружена, ждем контент...")
-                await page.wait_for_timeout(5000)
+                if not offers_data:
+                    logger.warning("Предложения не найдены, пробуем альтернативный подход...")
+                    offers_data = await self.find_offers_alternative(page)
                 
-                # Парсим страницы пока не достигнем максимальной цены
-                while page_number <= 10:  # Максимум 10 страниц для безопасности
-                    logger.info(f"Парсим страницу {page_number}...")
-                    
-                    # Ищем предложения на текущей странице
-                    offers_data = await self.find_offers(page)
-                    
                     if not offers_data:
-                        logger.warning("Предложения не найдены, пробуем альтернативный подход...")
-                        offers_data = await self.find_offers_alternative(page)
-                    
-                        if not offers_data:
-                            logger.info("Предложения не найдены, завершаем парсинг")
-                            break
-                    
-                    # Парсим предложения с текущей страницы
-                    page_offers = []
-                    max_price_on_page = 0
-                    
-                    for i in range(len(offers_data)):
-                        try:
-                            element = offers_data[i]
-                            offer_data = await self.extract_offer_data(element, i)
-                            if offer_data and offer_data.get('price', 0) > 0:
-                                page_offers.append(offer_data)
-                                max_price_on_page = max(max_price_on_page, offer_data['price'])
-                        except Exception as e:
-                            logger.warning(f"Ошибка парсинга предложения {i}: {e}")
-                        continue
-                    
-                    if page_offers:
-                        all_offers.extend(page_offers)
-                        logger.info(f"Страница {page_number}: собрано {len(page_offers)} предложений, максимальная цена: {max_price_on_page:.0f} PLN")
-                        
-                        # Проверяем, достигли ли максимальной цены
-                        if max_price_on_page >= max_price_threshold:
-                            logger.info(f"Достигнута максимальная цена {max_price_threshold} PLN, завершаем парсинг")
-                            break
-                    else:
-                        logger.info(f"На странице {page_number} не найдено предложений")
+                        logger.info("Предложения не найдены, завершаем парсинг")
                         break
-                    
-                    # Ищем кнопку "Следующая страница"
-                    next_page_url = await self.find_next_page_url(page)
-                    if not next_page_url:
-                        logger.info("Кнопка 'Следующая страница' не найдена, завершаем парсинг")
-                        break
-                    
-                    # Переходим на следующую страницу
-                    logger.info(f"Переходим на страницу {page_number + 1}...")
+                
+                # Парсим предложения с текущей страницы: данные всех карточек собираются
+                # одним вызовом в браузере
+                page_offers = []
+                max_price_on_page = 0
+                try:
+                    raw_offers = await self.collect_offers_raw(page, offers_data)
+                except Exception as e:
+                    logger.warning(f"Ошибка сбора данных предложений: {e}")
+                    raw_offers = []
+                
+                for i, raw_offer in enumerate(raw_offers):
                     try:
-                        await page.goto(next_page_url, wait_until='domcontentloaded', timeout=self.config['wait_timeout'])
-                        await page.wait_for_timeout(3000)  # Ждем загрузки контента
-                        page_number += 1
+                        offer_data = self.extract_offer_data(raw_offer, i, url)
+                        if offer_data and offer_data.get('price', 0) > 0:
+                            page_offers.append(offer_data)
+                            max_price_on_page = max(max_price_on_page, offer_data['price'])
                     except Exception as e:
-                        logger.warning(f"Ошибка перехода на страницу {page_number + 1}: {e}")
+                        logger.warning(f"Ошибка парсинга предложения {i}: {e}")
+                    continue
+                
+                if page_offers:
+                    all_offers.extend(page_offers)
+                    logger.info(f"Страница {page_number}: собрано {len(page_offers)} предложений, максимальная цена: {max_price_on_page:.0f} PLN")
+                    
+                    # Проверяем, достигли ли максимальной цены
+                    if max_price_on_page >= max_price_threshold:
+                        logger.info(f"Достигнута максимальная цена {max_price_threshold} PLN, завершаем парсинг")
                         break
+                else:
+                    logger.info(f"На странице {page_number} не найдено предложений")
+                    break
                 
-                logger.info(f"Парсинг завершен. Всего собрано {len(all_offers)} предложений с {page_number} страниц")
+                # Ищем кнопку "Следующая страница"
+                next_page_url = await self.find_next_page_url(page, url)
+                if not next_page_url:
+                    logger.info("Кнопка 'Следующая страница' не найдена, завершаем парсинг")
+                    break
                 
-            except Exception as e:
-                logger.error(f"Ошибка при парсинге: {e}")
-            finally:
+                # Переходим на следующую страницу
+                logger.info(f"Переходим на страницу {page_number + 1}...")
                 try:
-                    await browser.close()
-                except:
-                    pass
-        
+                    await page.goto(next_page_url, wait_until='domcontentloaded', timeout=self.config['wait_timeout'])
+                    await self.wait_for_offers(page)  # Ждем загрузки контента
+                    page_number += 1
+                except Exception as e:
+                    logger.warning(f"Ошибка перехода на страницу {page_number + 1}: {e}")
+                    break
+            
+            logger.info(f"Парсинг завершен. Всего собрано {len(all_offers)} предложений с {page_number} страниц")
+            
+        except Exception as e:
+            logger.error(f"Ошибка при парсинге: {e}")
+        finally:
+            try:
+                await context.close()
+            except:
+                pass
+    
         return all_offers
 
-    def _extract_price_limit(self) -> Optional[float]:
-        """Пробует достать лимит цены из URL (filter[PriceTo]=...)."""
+    def _extract_price_limit(self, url: str) -> Optional[float]:
+        """Пробует достать лимит цены из URL поиска (filter[PriceTo]=...)."""
         try:
-            url = self.config.get('url', '') or ''
-            import re
+            url = url or ''
             m = re.search(r'(?:PriceTo]|PriceTo)=(\d+)', url)
             if m:
                 return float(m.group(1))
@@ -206,20 +455,14 @@ class TravelPriceMonitor:
             df = pd.read_csv(filepath, quoting=csv.QUOTE_ALL, on_bad_lines='skip')
             if df.empty or 'scraped_at' not in df.columns:
                 return pd.DataFrame()
-            raw = df['scraped_at'].astype(str)
-            mask_tz = raw.str.contains(r"Z$|[+-]\d{2}:\d{2}$", regex=True)
-            tz_series = pd.to_datetime(raw.where(mask_tz), errors='coerce', utc=True)
-            tz_series = tz_series.dt.tz_convert('UTC')
-            naive_series = pd.to_datetime(raw.where(~mask_tz), errors='coerce')
-            try:
-                naive_series = naive_series.dt.tz_localize('UTC')
-            except Exception:
-                pass
-            ts = tz_series.combine_first(naive_series)
+            # Смешанные ISO8601 с/без таймзоны за один проход: метки без таймзоны считаются UTC
+            ts = pd.to_datetime(df['scraped_at'].astype(str), errors='coerce', utc=True, format='ISO8601')
             df = df.assign(_ts=ts).dropna(subset=['_ts'])
-            # Берем по каждому отелю последнюю запись
-            idx = df.sort_values('_ts').groupby('hotel_name').tail(1).index
-            latest = df.loc[idx, ['hotel_name', 'price', '_ts']].copy()
+            # Берем по каждому отелю последнюю запись: idxmax по группе, без сортировки всей истории
+            idx = df.groupby('hotel_name')['_ts'].idxmax()
+            # url — поиск, в котором отель видели последним (в старых CSV колонки может не быть)
+            columns = ['hotel_name', 'price', '_ts'] + (['url'] if 'url' in df.columns else [])
+            latest = df.loc[idx, columns].copy()
             return latest
         except Exception:
             return pd.DataFrame()
@@ -242,14 +485,25 @@ class TravelPriceMonitor:
             except Exception:
                 alerts_doc = { 'alerts': [] }
 
-        price_limit = self._extract_price_limit()
         now_iso = datetime.now(timezone.utc).isoformat()
+        # Одна запись на отель — индексируем по имени вместо фильтрации таблицы для каждого отеля
+        prev_by_name = latest_prev.set_index(latest_prev['hotel_name'].astype(str))
+        prev_prices = prev_by_name['price']
+        # Лимит цены берем из URL поиска, в котором отель видели последним
+        prev_urls = prev_by_name['url'] if 'url' in prev_by_name.columns else None
+        default_url = self.get_target_urls()[0]
+        price_limits: Dict[str, Optional[float]] = {}
         for name in missing_hotels:
             try:
-                prev_row = latest_prev[latest_prev['hotel_name'] == name]
-                last_price = float(prev_row['price'].iloc[0]) if not prev_row.empty else None
+                last_price = float(prev_prices[name]) if name in prev_prices.index else None
             except Exception:
                 last_price = None
+            url = prev_urls[name] if prev_urls is not None and name in prev_urls.index else default_url
+            if not isinstance(url, str) or not url:
+                url = default_url
+            if url not in price_limits:
+                price_limits[url] = self._extract_price_limit(url)
+            price_limit = price_limits[url]
             note = 'Отель отсутствует в результатах поиска'
             if price_limit is not None:
                 note += f' (вероятно цена > {int(price_limit)} PLN либо предложение снято)'
@@ -263,15 +517,21 @@ class TravelPriceMonitor:
             })
 
         try:
-            with open(alerts_path, 'w', encoding='utf-8') as f:
-                json.dump(alerts_doc, f, ensure_ascii=False, indent=2)
+            _dump_json_compact(alerts_path, alerts_doc)
         except Exception:
             logger.warning('Не удалось сохранить алерты о пропавших отелях')
 
-    def detect_missing_hotels_and_alert(self, current_offers: List[Dict[str, Any]]):
-        """Определяет отели, исчезнувшие из текущей выдачи, и пишет алерты."""
+    def detect_missing_hotels_and_alert(self, current_offers: List[Dict[str, Any]],
+                                        failed_urls: Optional[List[str]] = None):
+        """Определяет отели, исчезнувшие из текущей выдачи, и пишет алерты.
+
+        Отели, которых последний раз видели в поисках из failed_urls, не проверяются:
+        эти поиски в текущем запуске не собраны, и их отели пропали бы из выдачи все разом.
+        """
         try:
             latest_prev = self._load_previous_hotels_latest()
+            if failed_urls and 'url' in latest_prev.columns:
+                latest_prev = latest_prev[~latest_prev['url'].isin(failed_urls)]
             if latest_prev.empty:
                 return
             prev_hotels: set = set(latest_prev['hotel_name'].astype(str).tolist())
@@ -283,35 +543,84 @@ class TravelPriceMonitor:
         except Exception as e:
             logger.warning(f"Не удалось определить пропавшие отели: {e}")
 
-    async def find_offers(self, page) -> List:
-        """Ищет предложения на странице"""
-        selectors_to_try = [
-            '.offer-item',
-            '.trip-item', 
-            '.hotel-item',
-            '.search-result-item',
-            '[data-testid*="offer"]',
-            '.result-item',
-            '.offer',
-            '.trip',
-            '.hotel',
-            '[class*="offer"]',
-            '[class*="trip"]',
-            '[class*="hotel"]'
-        ]
-        
-        for selector in selectors_to_try:
+    async def wait_for_offers(self, page):
+        """Ждет появления в DOM контейнеров предложений вместо фиксированной паузы.
+
+        Если ни один контейнер не появился за wait_timeout, ждет затишья сети (до 5 секунд):
+        дальше find_offers и find_offers_alternative разбирают то, что успело загрузиться.
+        """
+        try:
+            await page.wait_for_selector(', '.join(OFFER_CONTAINER_SELECTORS), state='attached',
+                                         timeout=self.config['wait_timeout'])
+        except Exception as e:
+            logger.debug(f"Контейнеры предложений не появились: {e}")
             try:
-                await page.wait_for_selector(selector, timeout=10000)
+                await page.wait_for_load_state('networkidle', timeout=5000)
+            except Exception:
+                pass
+
+    async def find_offers(self, page, url: str) -> List:
+        """Ищет предложения на странице.
+
+        Одно ожидание объединенного селектора вместо ожидания каждого кандидата по очереди,
+        затем в браузере выбирается первый по приоритету селектор с видимыми элементами.
+        """
+        try:
+            await page.wait_for_selector(', '.join(OFFER_CONTAINER_SELECTORS), timeout=10000)
+            # Селектор, сработавший в прошлый раз для этого URL, проверяем первым
+            remembered = self._get_offer_selector(url)
+            candidates = OFFER_CONTAINER_SELECTORS
+            if remembered in candidates:
+                candidates = [remembered] + [sel for sel in candidates if sel != remembered]
+            selector = await page.evaluate(PICK_SELECTOR_JS, candidates)
+            if selector:
                 elements = await page.query_selector_all(selector)
                 if elements and len(elements) > 0:
                     logger.info(f"Найдено {len(elements)} предложений с селектором: {selector}")
+                    if selector != remembered:
+                        self._save_offer_selector(url, selector)
                     return elements
-            except:
-                continue
+        except Exception as e:
+            logger.debug(f"Контейнеры предложений не найдены: {e}")
         
         return []
 
+    def _offer_selectors_path(self) -> str:
+        """Файл с селекторами контейнеров предложений по URL (без параметров)"""
+        return os.path.join(self.config['data_dir'], 'offer_selectors.json')
+
+    def _get_offer_selector(self, url: str) -> Optional[str]:
+        """Сработавший ранее селектор контейнеров для url (файл читается один раз за запуск)"""
+        if self._offer_selectors is None:
+            selectors: Dict[str, str] = {}
+            try:
+                path = self._offer_selectors_path()
+                if os.path.exists(path):
+                    with open(path, 'r', encoding='utf-8') as f:
+                        selectors = json.load(f)
+            except Exception:
+                selectors = {}
+            self._offer_selectors = selectors
+        return self._offer_selectors.get(url.split('?')[0]) or None
+
+    def _save_offer_selector(self, url: str, selector: str):
+        """Запоминает сработавший селектор контейнеров для url"""
+        if self._offer_selectors is None:
+            self._offer_selectors = {}
+        self._offer_selectors[url.split('?')[0]] = selector
+        path = self._offer_selectors_path()
+        try:
+            # Перечитываем файл перед записью: его же обновляют мониторы других стран
+            selectors: Dict[str, str] = {}
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    selectors = json.load(f)
+            selectors[url.split('?')[0]] = selector
+            os.makedirs(self.config['data_dir'], exist_ok=True)
+            _dump_json_compact(path, selectors)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить селектор предложений: {e}")
+
     async def find_offers_alternative(self, page) -> List:
         """Альтернативный поиск предложений"""
         try:
@@ -332,8 +641,8 @@ class TravelPriceMonitor:
         
         return []
 
-    async def find_next_page_url(self, page) -> str:
-        """Ищет URL следующей страницы"""
+    async def find_next_page_url(self, page, url: str) -> str:
+        """Ищет URL следующей страницы выдачи по url"""
         try:
             # Ищем кнопку "Следующая страница" или "Następna"
             next_page_selectors = [
@@ -362,12 +671,12 @@ class TravelPriceMonitor:
                             if href:
                                 # Если href относительный, делаем его абсолютным
                                 if href.startswith('/'):
-                                    base_url = self.config['url'].split('?')[0]
+                                    base_url = url.split('?')[0]
                                     return base_url + href
                                 elif href.startswith('http'):
                                     return href
                                 else:
-                                    return self.config['url'] + '&' + href
+                                    return url + '&' + href
                 except:
                     continue
             
@@ -393,12 +702,12 @@ class TravelPriceMonitor:
                         if page_num == current_page + 1:
                             if href:
                                 if href.startswith('/'):
-                                    base_url = self.config['url'].split('?')[0]
+                                    base_url = url.split('?')[0]
                                     return base_url + href
                                 elif href.startswith('http'):
                                     return href
                                 else:
-                                    return self.config['url'] + '&' + href
+                                    return url + '&' + href
                     except:
                         continue
                 except:
@@ -413,12 +722,12 @@ class TravelPriceMonitor:
                         href = await link.get_attribute('href')
                         if href:
                             if href.startswith('/'):
-                                base_url = self.config['url'].split('?')[0]
+                                base_url = url.split('?')[0]
                                 return base_url + href
                             elif href.startswith('http'):
                                 return href
                             else:
-                                return self.config['url'] + '&' + href
+                                return url + '&' + href
                 except:
                     continue
             
@@ -428,34 +737,35 @@ class TravelPriceMonitor:
             logger.warning(f"Ошибка поиска следующей страницы: {e}")
             return ""
 
-    async def extract_offer_data(self, element, index: int) -> Dict[str, Any]:
-        """Извлекает данные из элемента предложения"""
+    async def collect_offers_raw(self, page, elements: List) -> List[Optional[Dict[str, Any]]]:
+        """Собирает сырые данные карточек предложений одним page.evaluate (см. COLLECT_OFFERS_JS).
+
+        Для карточек короче 10 символов возвращается None.
+        """
+        if not elements:
+            return []
+        return await page.evaluate(COLLECT_OFFERS_JS, [elements, OFFER_FIELD_SELECTORS])
+
+    def extract_offer_data(self, raw: Optional[Dict[str, Any]], index: int, url: str) -> Optional[Dict[str, Any]]:
+        """Извлекает данные предложения из сырых данных карточки страницы выдачи url"""
         try:
-            # Получаем весь текст элемента
-            full_text = await element.inner_text()
-            if not full_text or len(full_text.strip()) < 10:
+            if not raw:
                 return None
+            if raw.get('error'):
+                raise Exception(raw['error'])
             
-            # Ищем название отеля/тура
-            hotel_name = await self.extract_text_by_selectors(element, [
-                'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-                '.title', '.name', '.hotel-name', '.offer-title',
-                '[class*="title"]', '[class*="name"]', '[class*="hotel"]'
-            ])
+            # Весь текст элемента
+            full_text = raw['full_text']
             
-            # Ищем цену - сначала ищем цену за всех, потом за одного
-            price = await self.extract_price_for_all(element)
-            if not price:
-                price = await self.extract_text_by_selectors(element, [
-                    '.price', '.cost', '.amount', '.value',
-                    '[class*="price"]', '[class*="cost"]', '[class*="amount"]'
-                ])
+            # Название отеля/тура
+            hotel_name = raw['hotel_name']
             
-            # Ищем даты - более специфичные селекторы для fly.pl
-            dates = await self.extract_dates_from_offer(element)
+            # Цена - сначала цена за всех, потом за одного
+            price = raw['price']
             
-            # Ищем длительность - более специфичные селекторы для fly.pl
-            duration = await self.extract_duration_from_offer(element)
+            # Даты и длительность - по текстам подходящих элементов карточки
+            dates = self.extract_dates_from_offer(raw)
+            duration = self.extract_duration_from_offer(raw)
             
             # Если не нашли, используем значения по умолчанию из конфигурации
             if not dates:
@@ -467,13 +777,13 @@ class TravelPriceMonitor:
             rating = ""
             
             # Изображение отеля (если доступно на карточке)
-            image_url = await self.extract_image_url_from_offer(element)
+            image_url = self.extract_image_url_from_offer(raw)
             
             # Ссылка на детальную страницу предложения
-            offer_url = await self.extract_offer_url(element)
+            offer_url = self.extract_offer_url(raw)
             
             # Извлекаем аэропорт вылета
-            departure_airport = self.extract_departure_airport_from_url(self.config['url'])
+            departure_airport = self.extract_departure_airport_from_url(url)
             
             # Очищаем и форматируем данные
             hotel_name = self.clean_text(hotel_name) if hotel_name else f"Предложение {index + 1}"
@@ -496,7 +806,7 @@ class TravelPriceMonitor:
                 'departure_airport': departure_airport,
                 # Записываем временную метку в UTC с таймзоной, чтобы унифицировать время между локальными и CI-запусками
                 'scraped_at': datetime.now(timezone.utc).isoformat(),
-                'url': self.config['url'],
+                'url': url,
                 'image_url': image_url or "",
                 'offer_url': offer_url or ""
             }
@@ -505,63 +815,46 @@ class TravelPriceMonitor:
             logger.warning(f"Ошибка извлечения данных из элемента {index}: {e}")
             return None
 
-    async def extract_image_url_from_offer(self, element) -> str:
+    def extract_image_url_from_offer(self, raw: Dict[str, Any]) -> str:
         """Пытается извлечь URL главного изображения из карточки предложения."""
         try:
+            import re
             # 1) Пробуем <img src> / data-src
-            img_el = await element.query_selector('img')
-            if img_el:
-                for attr in ['src', 'data-src', 'data-original', 'data-lazy']:
-                    val = await img_el.get_attribute(attr)
-                    if val and val.strip() and val.startswith('http'):
-                        return val.strip()
-            
-            # 2) Пробуем фоновые изображения из inline-style
-            bg_el = await element.query_selector('[style*="background"]')
-            if bg_el:
-                bg = await bg_el.get_attribute('style')
+            for val in raw.get('image_attrs') or []:
+                if val and val.strip() and val.startswith('http'):
+                    return val.strip()
+            
+            # 2) Пробуем фоновые изображения из inline-style,
+            # 3) затем вычисленный стиль (менее гарантировано)
+            for bg in (raw.get('background_style'), raw.get('computed_background')):
                 if bg and 'url(' in bg:
-                    import re
                     m = re.search(r'url\(("|")?(?P<u>[^\)"\']+)("|")?\)', bg)
                     if m:
                         url = m.group('u')
                         if url.startswith('http'):
                             return url
-            
-            # 3) Пробуем вычисленный стиль (менее гарантировано)
-            try:
-                url = await element.evaluate("el => getComputedStyle(el).backgroundImage")
-                if url and 'url(' in url:
-                    import re
-                    m = re.search(r'url\(("|")?(?P<u>[^\)"\']+)("|")?\)', url)
-                    if m:
-                        u = m.group('u')
-                        if u.startswith('http'):
-                            return u
-            except:
-                pass
         except Exception as e:
             logger.debug(f"Не удалось извлечь изображение: {e}")
         return ""
 
-    async def extract_offer_url(self, element) -> str:
+    def extract_offer_url(self, raw: Dict[str, Any]) -> str:
         """Извлекает URL ссылку на детальную страницу предложения"""
         try:
             logger.info("🔍 Начинаем извлечение ссылки на предложение...")
             
             # 1) Проверяем, является ли сам элемент ссылкой
-            tag_name = await element.evaluate("el => el.tagName.toLowerCase()")
-            if tag_name == 'a':
-                href = await element.get_attribute('href')
+            if raw.get('tag') == 'a':
+                href = raw.get('href')
                 if href and href.strip():
                     logger.info(f"✅ Найдена ссылка в самом элементе: {href[:100]}...")
                     return self.make_absolute_url(href)
             
+            links = dict(zip(OFFER_FIELD_SELECTORS['links'], raw.get('link_hrefs') or []))
+            
             # 2) Ищем ссылку с классом image-link (основной селектор для ссылок на предложения)
-            image_link = await element.query_selector('a.image-link')
-            if image_link:
-                href = await image_link.get_attribute('href')
-                if href and href.strip():
+            href = links.get('a.image-link')
+            if href is not None:
+                if href.strip():
                     logger.info(f"✅ Найдена ссылка через a.image-link: {href[:100]}...")
                     return self.make_absolute_url(href)
                 else:
@@ -570,17 +863,14 @@ class TravelPriceMonitor:
                 logger.info("❌ a.image-link не найден")
             
             # 3) Ищем ссылку с классом offer-con (альтернативный селектор)
-            offer_link = await element.query_selector('a.offer-con')
-            if offer_link:
-                href = await offer_link.get_attribute('href')
-                if href and href.strip():
-                    return self.make_absolute_url(href)
+            href = links.get('a.offer-con')
+            if href and href.strip():
+                return self.make_absolute_url(href)
             
             # 4) Ищем ссылки на /wycieczka/ (детальные страницы предложений)
-            wycieczka_link = await element.query_selector('a[href*="/wycieczka/"]')
-            if wycieczka_link:
-                href = await wycieczka_link.get_attribute('href')
-                if href and href.strip():
+            href = links.get('a[href*="/wycieczka/"]')
+            if href is not None:
+                if href.strip():
                     logger.info(f"✅ Найдена ссылка через a[href*='/wycieczka/']: {href[:100]}...")
                     return self.make_absolute_url(href)
                 else:
@@ -589,39 +879,18 @@ class TravelPriceMonitor:
                 logger.info("❌ a[href*='/wycieczka/'] не найден")
             
             # 5) Ищем другие возможные ссылки на предложения
-            link_selectors = [
-                'a[href*="offer"]',        # Ссылка содержащая "offer"
-                'a[href*="hotel"]',        # Ссылка содержащая "hotel"
-                'a[href*="trip"]',         # Ссылка содержащая "trip"
-                'a[href*="detail"]',       # Ссылка содержащая "detail"
-                'a[href*="view"]',         # Ссылка содержащая "view"
-                'a[class*="link"]',        # Ссылка с классом содержащим "link"
-                'a[href]'                  # Любая ссылка
-            ]
-            
-            for selector in link_selectors:
-                try:
-                    link_element = await element.query_selector(selector)
-                    if link_element:
-                        href = await link_element.get_attribute('href')
-                        if href and href.strip():
-                            # Проверяем, что это ссылка на предложение
-                            if '/wycieczka/' in href or 'offer' in href.lower():
-                                return self.make_absolute_url(href)
-                except:
-                    continue
+            for selector in OFFER_FIELD_SELECTORS['links'][3:]:
+                href = links.get(selector)
+                if href and href.strip():
+                    # Проверяем, что это ссылка на предложение
+                    if '/wycieczka/' in href or 'offer' in href.lower():
+                        return self.make_absolute_url(href)
             
-            # 6) Проверяем родительские элементы на наличие ссылок
-            try:
-                parent = await element.evaluate("el => el.parentElement")
-                if parent:
-                    parent_tag = await parent.evaluate("el => el.tagName.toLowerCase()")
-                    if parent_tag == 'a':
-                        href = await parent.get_attribute('href')
-                        if href and href.strip():
-                            return self.make_absolute_url(href)
-            except:
-                pass
+            # 6) Проверяем родительский элемент на наличие ссылки
+            if raw.get('parent_tag') == 'a':
+                href = raw.get('parent_href')
+                if href and href.strip():
+                    return self.make_absolute_url(href)
                 
         except Exception as e:
             logger.debug(f"Не удалось извлечь ссылку на предложение: {e}")
@@ -649,46 +918,6 @@ class TravelPriceMonitor:
         
         return url
 
-    async def extract_price_for_all(self, element) -> str:
-        """Извлекает цену за всех (za wszystkich)"""
-        try:
-            # Ищем элементы с текстом "za wszystkich" или "za wszystkie"
-            price_elements = await element.query_selector_all('[class*="price"]')
-            
-            for price_element in price_elements:
-                text = await price_element.inner_text()
-                if text and ('za wszystkich' in text.lower() or 'za wszystkie' in text.lower()):
-                    # Ищем число в этом элементе
-                    import re
-                    numbers = re.findall(r'[\d\s,]+', text.replace('.', '').replace(',', '.'))
-                    if numbers:
-                        return text.strip()
-            
-            # Альтернативный поиск - ищем элементы с классом price-view-2 (цена за всех)
-            price_view_2 = await element.query_selector('.price-view-2, [class*="price-view-2"]')
-            if price_view_2:
-                text = await price_view_2.inner_text()
-                if text and text.strip():
-                    return text.strip()
-            
-            return ""
-        except Exception as e:
-            logger.warning(f"Ошибка извлечения цены за всех: {e}")
-            return ""
-
-    async def extract_text_by_selectors(self, element, selectors: List[str]) -> str:
-        """Извлекает текст используя различные селекторы"""
-        for selector in selectors:
-            try:
-                sub_element = await element.query_selector(selector)
-                if sub_element:
-                    text = await sub_element.inner_text()
-                    if text and text.strip():
-                        return text.strip()
-            except:
-                continue
-        return ""
-
     def clean_text(self, text: str) -> str:
         """Очищает текст от лишних символов"""
         if not text:
@@ -733,37 +962,16 @@ class TravelPriceMonitor:
             logger.warning(f"Ошибка извлечения длительности из URL: {e}")
         return ""
     
-    async def extract_dates_from_offer(self, element) -> str:
+    def extract_dates_from_offer(self, raw: Dict[str, Any]) -> str:
         """Извлекает даты вылета-прилета из конкретного предложения"""
         try:
-            # Ищем различные селекторы для дат на fly.pl
-            date_selectors = [
-                # Основные селекторы дат
-                '.date', '.dates', '.departure-date', '.arrival-date',
-                '.travel-date', '.trip-date', '.journey-date',
-                # Селекторы с классами
-                '[class*="date"]', '[class*="departure"]', '[class*="arrival"]',
-                '[class*="travel"]', '[class*="trip"]', '[class*="journey"]',
-                # Селекторы с data-атрибутами
-                '[data-date]', '[data-departure]', '[data-arrival]',
-                # Селекторы для периодов
-                '.period', '.range', '.from-to',
-                # Селекторы для времени
-                '.time', '.when', '.schedule'
-            ]
-            
-            for selector in date_selectors:
-                try:
-                    date_elements = await element.query_selector_all(selector)
-                    for date_element in date_elements:
-                        text = await date_element.inner_text()
-                        if text and self.is_date_text(text):
-                            return self.clean_text(text)
-                except:
-                    continue
+            # Тексты элементов по селекторам дат (OFFER_FIELD_SELECTORS['dates'])
+            for text in raw.get('date_texts') or []:
+                if text and self.is_date_text(text):
+                    return self.clean_text(text)
             
             # Ищем в тексте элемента паттерны дат
-            full_text = await element.inner_text()
+            full_text = raw.get('full_text')
             if full_text:
                 import re
                 # Ищем паттерны типа "20.09 - 04.10" или "20.09.2025 - 04.10.2025"
@@ -784,33 +992,16 @@ class TravelPriceMonitor:
             logger.warning(f"Ошибка извлечения дат из предложения: {e}")
             return ""
     
-    async def extract_duration_from_offer(self, element) -> str:
+    def extract_duration_from_offer(self, raw: Dict[str, Any]) -> str:
         """Извлекает длительность (дни/ночи) из конкретного предложения"""
         try:
-            # Ищем различные селекторы для длительности на fly.pl
-            duration_selectors = [
-                # Основные селекторы длительности
-                '.duration', '.nights', '.days', '.length',
-                '.trip-duration', '.stay-duration', '.period',
-                # Селекторы с классами
-                '[class*="duration"]', '[class*="nights"]', '[class*="days"]',
-                '[class*="length"]', '[class*="period"]',
-                # Селекторы с data-атрибутами
-                '[data-duration]', '[data-nights]', '[data-days]'
-            ]
-            
-            for selector in duration_selectors:
-                try:
-                    duration_elements = await element.query_selector_all(selector)
-                    for duration_element in duration_elements:
-                        text = await duration_element.inner_text()
-                        if text and self.is_duration_text(text):
-                            return self.clean_text(text)
-                except:
-                    continue
+            # Тексты элементов по селекторам длительности (OFFER_FIELD_SELECTORS['duration'])
+            for text in raw.get('duration_texts') or []:
+                if text and self.is_duration_text(text):
+                    return self.clean_text(text)
             
             # Ищем в тексте элемента паттерны длительности
-            full_text = await element.inner_text()
+            full_text = raw.get('full_text')
             if full_text:
                 import re
                 # Ищем паттерны типа "7 dni", "7 noclegów", "7 days", "7 nights"
@@ -879,20 +1070,15 @@ class TravelPriceMonitor:
         return False
 
     def extract_price(self, price_text: str) -> float:
-        """Извлекает числовое значение цены из текста"""
+        """Извлекает числовое значение цены из текста (округленное до целых PLN)"""
         if not price_text:
             return 0
         
-        import re
-        # Ищем числа в тексте
-        numbers = re.findall(r'[\d\s,]+', price_text.replace('.', '').replace(',', '.'))
-        if numbers:
-            try:
-                price_str = numbers[0].replace(' ', '')
-                return float(price_str)
-            except:
-                pass
-        return 0
+        match = PRICE_RE.search(price_text)
+        if not match:
+            return 0
+        integer_part, fraction = match.groups()
+        return float(round(float(NON_DIGIT_RE.sub('', integer_part) + '.' + (fraction or '0'))))
     
     def extract_departure_airport_from_url(self, url: str) -> str:
         """Извлекает аэропорт вылета из URL"""
@@ -926,7 +1112,20 @@ class TravelPriceMonitor:
         # чтобы графики и анализ имели полную временную серию даже без изменений цен.
         new_offers = offers
         
-        # Всегда перезаписываем файл с правильными заголовками для совместимости
+        fieldnames = CSV_FIELDNAMES
+        
+        if self._can_append_csv(filepath):
+            # Файл уже в текущем формате - дописываем только новые строки, не перечитывая историю.
+            # Одна запись to_csv вместо writerow на каждое предложение; формат как у csv.DictWriter
+            pd.DataFrame(new_offers, columns=fieldnames, dtype=object).to_csv(
+                filepath, mode='a', header=False, index=False, encoding='utf-8',
+                quoting=csv.QUOTE_ALL, lineterminator='\r\n'
+            )
+            logger.info(f"Добавлено {len(new_offers)} записей (включая возможные повторы для истории) в {filepath}")
+            self._update_hotel_images(new_offers)
+            return
+        
+        # Старый формат (или файла нет) - перезаписываем файл с правильными заголовками
         existing_data = []
         file_exists = os.path.exists(filepath)
         
@@ -956,7 +1155,6 @@ class TravelPriceMonitor:
         
         # Перезаписываем файл с правильными заголовками
         with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['hotel_name', 'price', 'dates', 'duration', 'rating', 'departure_airport', 'scraped_at', 'url', 'image_url', 'offer_url']
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
             writer.writeheader()
             
@@ -969,8 +1167,23 @@ class TravelPriceMonitor:
                 writer.writerow({k: offer.get(k, '') for k in fieldnames})
         
         logger.info(f"Добавлено {len(new_offers)} записей (включая возможные повторы для истории) в {filepath}")
+        self._update_hotel_images(new_offers)
+
+    def _can_append_csv(self, filepath: str) -> bool:
+        """Можно ли просто дописать строки: заголовок совпадает с CSV_FIELDNAMES и файл заканчивается переводом строки"""
+        try:
+            with open(filepath, 'rb') as f:
+                header = next(csv.reader([f.readline().decode('utf-8')]), None)
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return header == CSV_FIELDNAMES and f.read(1) == b'\n'
+        except (OSError, UnicodeDecodeError):
+            return False
 
-        # Обновляем карту изображений по отелям в отдельном JSON
+    def _update_hotel_images(self, new_offers: List[Dict[str, Any]]):
+        """Обновляет карту изображений по отелям в отдельном JSON"""
         try:
             images_path = os.path.join(self.config['data_dir'], 'hotel_images.json')
             images_map: Dict[str, str] = {}
@@ -994,17 +1207,30 @@ class TravelPriceMonitor:
                         updated += 1
 
             if updated:
-                with open(images_path, 'w', encoding='utf-8') as jf:
-                    import json as _json
-                    _json.dump(images_map, jf, ensure_ascii=False, indent=2)
+                _dump_json_compact(images_path, images_map)
                 logger.info(f"Обновлена карта изображений для отелей: +{updated}")
         except Exception as e:
             logger.warning(f"Не удалось обновить карту изображений: {e}")
 
+    def _alert_manager(self) -> PriceAlertManagerV2:
+        """Менеджер алертов V2 для CSV текущего региона (файл алертов — <data_file>_alerts.jsonl)"""
+        alerts_file = self.data_file.replace('.csv', '_alerts.jsonl')
+        return PriceAlertManagerV2(
+            data_file=os.path.join(self.config['data_dir'], self.data_file), 
+            alerts_file=os.path.join(self.config['data_dir'], alerts_file)
+        )
+
     def create_charts(self):
         """Создает графики"""
         try:
-            df = self.load_data()
+            # matplotlib нужен только для графиков — импортируем здесь, с неинтерактивным backend (без Tk/Qt)
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+            
+            # Графикам нужны только hotel_name, price и scraped_at — берем их у менеджера V2:
+            # он хранит эти колонки в parquet-кэше и дочитывает из CSV только новые строки
+            df = self._alert_manager().df
             
             if df.empty:
                 logger.warning("Нет данных для создания графиков")
@@ -1017,21 +1243,9 @@ class TravelPriceMonitor:
             # График 1: Изменение цен по времени
             plt.figure(figsize=(15, 8))
             
-            # Робастный парсинг меток времени (смешанные ISO8601 с/без таймзоны)
-            raw = df['scraped_at'].astype(str)
-            mask_tz = raw.str.contains(r"Z$|[+-]\d{2}:\d{2}$", regex=True)
-            tz_series = pd.to_datetime(raw.where(mask_tz), errors='coerce', utc=True)
-            # Графики рисуем в локальном времени runner'а (UTC)
-            tz_series = tz_series.dt.tz_convert('UTC')
-            naive_series = pd.to_datetime(raw.where(~mask_tz), errors='coerce')
-            try:
-                naive_series = naive_series.dt.tz_localize('UTC')
-            except Exception:
-                pass
-            ts = tz_series.combine_first(naive_series)
-            df = df.assign(_ts=ts).dropna(subset=['_ts'])
-
-            daily_prices = df.groupby(df['_ts'].dt.date)['price'].agg(['mean', 'min', 'max'])
+            # scraped_at уже разобран в UTC (строки с некорректной датой отброшены),
+            # цену для агрегатов считаем в float64 — в кэше она хранится в float32
+            daily_prices = df['price'].astype('float64').groupby(df['scraped_at'].dt.date).agg(['mean', 'min', 'max'])
             
             plt.plot(daily_prices.index, daily_prices['mean'], marker='o', linewidth=2, label='Средняя цена')
             plt.fill_between(daily_prices.index, daily_prices['min'], daily_prices['max'], alpha=0.3, label='Диапазон цен')
@@ -1114,7 +1328,7 @@ class TravelPriceMonitor:
             with open(report_path, 'w', encoding='utf-8') as f:
                 f.write("=== ОТЧЕТ ПО МОНИТОРИНГУ ЦЕН НА ПУТЕШЕСТВИЯ ===\n\n")
                 f.write(f"Дата генерации: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"URL: {self.config['url']}\n\n")
+                f.write(f"URL: {', '.join(self.get_target_urls())}\n\n")
                 
                 f.write("=== СТАТИСТИКА ===\n")
                 f.write(f"Общее количество предложений: {len(df)}\n")
@@ -1139,12 +1353,7 @@ class TravelPriceMonitor:
     def check_price_alerts(self):
         """Проверяет изменения цен и создает алерты (новая логика V2)"""
         try:
-            # Создаем региональный файл алертов на основе data_file
-            alerts_file = self.data_file.replace('.csv', '_alerts.json')
-            alert_manager = PriceAlertManagerV2(
-                data_file=os.path.join(self.config['data_dir'], self.data_file), 
-                alerts_file=os.path.join(self.config['data_dir'], alerts_file)
-            )
+            alert_manager = self._alert_manager()
             
             if alert_manager.df.empty:
                 logger.warning("Нет данных для проверки алертов")
@@ -1224,7 +1433,7 @@ class TravelPriceMonitor:
                 return False
             
             # Перед сохранением проверяем, кто исчез из выдачи, и создаём алерты
-            self.detect_missing_hotels_and_alert(offers)
+            self.detect_missing_hotels_and_alert(offers, self.failed_urls)
             
             # Сохраняем данные (добавляем к существующим)
             self.save_data_append(offers)
@@ -1238,7 +1447,12 @@ class TravelPriceMonitor:
             # Проверяем изменения цен и создаем алерты
             self.check_price_alerts()
             
-            logger.info("✅ Мониторинг завершен успешно!")
+            if self.failed_urls:
+                # Данные сохранены только по собранным поискам — запуск неполный
+                logger.warning(f"⚠️ Мониторинг завершен частично: нет данных с {len(self.failed_urls)} "
+                               f"из {len(self.get_target_urls())} URL: {', '.join(self.failed_urls)}")
+            else:
+                logger.info("✅ Мониторинг завершен успешно!")
             return True
             
         except Exception as e: